@@ -34,8 +34,8 @@ def get_memory_consolidation_service(user_id: str):
 
 def get_intelligent_memory_service(user_id: str):
     try:
-        from app.services.memory import IntelligentMemoryService
-        return IntelligentMemoryService(user_id)
+        from app.services.memory import get_memory_service
+        return get_memory_service(user_id)
     except Exception as e:
         logger.error(f"Failed to import memory service: {e}")
         raise
@@ -89,7 +89,7 @@ async def analyze_image(
         # Analyze image with error handling for service availability
         try:
             vision_service = get_vision_service()
-            analysis = vision_service.analyze_image(image_data, prompt)
+            analysis = await vision_service.analyze_image(image_data, prompt)
         except Exception as service_error:
             logger.error(f"Vision service error: {service_error}")
             return {
@@ -183,16 +183,8 @@ async def get_user_patterns(
         proactive_service = get_proactive_service(user_id, db)
         
         # Get extended pattern analysis
-        recent_interactions = proactive_service._get_recent_interactions(days=days)
-        
-        patterns = {
-            "activity_patterns": proactive_service._analyze_activity_patterns(recent_interactions),
-            "topic_trends": proactive_service._analyze_topic_trends(recent_interactions),
-            "communication_insights": proactive_service._analyze_communication_style(recent_interactions),
-            "engagement_score": proactive_service._calculate_engagement_score(recent_interactions),
-            "analysis_period": f"{days} days",
-            "total_interactions": len(recent_interactions)
-        }
+        patterns = proactive_service.analyze_patterns(days=days)
+        patterns["analysis_period"] = f"{days} days"
         
         return {
             "success": True,
@@ -255,7 +247,7 @@ async def get_memory_clusters(
     """
     try:
         consolidation_service = get_memory_consolidation_service(user_id)
-        clusters = consolidation_service.identify_memory_clusters(max_clusters)
+        clusters = await consolidation_service.identify_memory_clusters(max_clusters)
         
         return {
             "success": True,
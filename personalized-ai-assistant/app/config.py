@@ -19,6 +19,16 @@ class Settings(BaseSettings):
     
     # ChromaDB
     chroma_persist_directory: str = "./data/chroma"
+    chroma_hnsw_construction_ef: int = 64
+    chroma_hnsw_m: int = 16
+    chroma_hnsw_search_ef: int = 64
+    vector_sidecar_max_memories: int = 10000
+    
+    # Memory consolidation
+    memory_consolidation_batch: bool = False
+    
+    # Vision
+    vision_max_concurrency: int = 8
     
     class Config:
         env_file = ".env"
@@ -32,6 +32,11 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Jobo AI Assistant...")
+    try:
+        from app.services.vision_service import close_vision_service
+        await close_vision_service()
+    except Exception as e:
+        logger.error(f"Failed to close vision service: {e}")
 
 app = FastAPI(
     title="Jobo AI Assistant",
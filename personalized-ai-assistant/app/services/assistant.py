@@ -4,7 +4,7 @@ from typing import Dict, Any, Optional, List
 from sqlalchemy.orm import Session
 from app.models.database import UserProfile, Interaction, LearnedPattern
 from app.services.embeddings import get_embedding_service
-from app.services.memory import IntelligentMemoryService
+from app.services.memory import get_memory_service
 from app.services.learning import LearningService
 from app.config import get_settings, is_intelligence_enabled
 import logging
@@ -73,7 +73,7 @@ class IntelligentPersonalizedAssistant:
         
         # Initialize intelligent memory service
         try:
-            self.memory_service = IntelligentMemoryService(self.user_id)
+            self.memory_service = get_memory_service(self.user_id)
             logger.debug("✅ Intelligent memory service connected")
         except Exception as e:
             logger.error(f"❌ Failed to initialize memory service: {e}")
@@ -148,13 +148,14 @@ class IntelligentPersonalizedAssistant:
         logger.info(f"  Learning System: {'✅ Active' if self.learning_service else '❌ Disabled'}")
         logger.info(f"  Overall Intelligence Level: {'🧠 Enhanced' if self.intelligence_enabled else '🔧 Basic'}")
     
-    def _build_intelligent_context(self, user_input: str) -> str:
+    async def _build_intelligent_context(self, user_input: str) -> str:
         """
         Build comprehensive context using all available intelligence systems.
         
         This is where the magic happens - instead of just using recent messages,
         we build context from the user's entire history, similar conversations,
         learned patterns, and semantic understanding of their current query.
+        Memory search and recent messages are fetched concurrently, off the event loop.
         """
         context_parts = [
             f"User Profile for {self.user_profile.name}:",
@@ -188,11 +189,12 @@ class IntelligentPersonalizedAssistant:
         # Add semantic memory context (the intelligent part)
         if self.memory_service and self.intelligence_enabled:
             try:
-                # Search for semantically related memories
-                relevant_memories = self.memory_service.search_memories(
-                    user_input, 
+                # Search for semantically related memories, alongside the recent conversation
+                relevant_memories, recent_messages = await self.memory_service.aget_memory_context(
+                    user_input,
                     n_results=3,
-                    similarity_threshold=0.7
+                    similarity_threshold=0.7,
+                    limit=4
                 )
                 
                 if relevant_memories.get('documents') and relevant_memories['documents'][0]:
@@ -208,7 +210,6 @@ class IntelligentPersonalizedAssistant:
                     context_parts.append("")
                     
                 # Add short-term conversation context
-                recent_messages = self.memory_service.get_short_term_memory(limit=4)
                 if recent_messages:
                     context_parts.append("Recent Conversation:")
                     for msg in recent_messages[-3:]:  # Last 3 messages for context
@@ -219,18 +220,18 @@ class IntelligentPersonalizedAssistant:
             except Exception as e:
                 logger.warning(f"Could not build intelligent context: {e}")
                 # Fall back to basic context building
-                self._add_basic_memory_context(context_parts, user_input)
+                await self._add_basic_memory_context(context_parts, user_input)
         else:
             # Use basic memory context when intelligence isn't available
-            self._add_basic_memory_context(context_parts, user_input)
+            await self._add_basic_memory_context(context_parts, user_input)
         
         return "\n".join(context_parts)
     
-    def _add_basic_memory_context(self, context_parts: List[str], user_input: str):
+    async def _add_basic_memory_context(self, context_parts: List[str], user_input: str):
         """Add basic memory context when intelligent memory isn't available"""
         if self.memory_service:
             try:
-                recent_messages = self.memory_service.get_short_term_memory(limit=5)
+                recent_messages = await self.memory_service.aget_short_term_memory(limit=5)
                 if recent_messages:
                     context_parts.append("Recent conversation:")
                     for msg in recent_messages[-3:]:
@@ -289,7 +290,7 @@ Your goal is to be a helpful, intelligent companion that {value_growth}."""
         # Add to short-term memory for immediate context
         if self.memory_service:
             try:
-                self.memory_service.add_to_short_term_memory({
+                await self.memory_service.aadd_to_short_term_memory({
                     "role": "user",
                     "content": user_input,
                     "timestamp": start_time.isoformat()
@@ -316,7 +317,7 @@ Your goal is to be a helpful, intelligent companion that {value_growth}."""
         # Add response to short-term memory
         if self.memory_service:
             try:
-                self.memory_service.add_to_short_term_memory({
+                await self.memory_service.aadd_to_short_term_memory({
                     "role": "assistant",
                     "content": response_text,
                     "timestamp": datetime.utcnow().isoformat()
@@ -341,7 +342,7 @@ Your goal is to be a helpful, intelligent companion that {value_growth}."""
         
         # Add context summary for debugging/transparency
         if settings.environment == "development":
-            context = self._build_intelligent_context(user_input)
+            context = await self._build_intelligent_context(user_input)
             response_data["context_used"] = context[:200] + "..." if len(context) > 200 else context
         
         return response_data
@@ -350,7 +351,7 @@ Your goal is to be a helpful, intelligent companion that {value_growth}."""
         """Generate response using Claude with full intelligence context and web search"""
         try:
             # Build comprehensive context
-            context = self._build_intelligent_context(user_input)
+            context = await self._build_intelligent_context(user_input)
             
             # Generate intelligent system prompt
             system_prompt = self._generate_intelligent_system_prompt(context, user_input)
@@ -1,15 +1,161 @@
 from typing import List, Dict, Any, Optional, Tuple
 import redis
+import redis.asyncio
+import asyncio
 import json
+import numpy as np
 import logging
 import hashlib
 import uuid
+import os
+import re
+import threading
+import time
+from cachetools import TTLCache
+from functools import lru_cache
 from datetime import datetime, timedelta
 from app.config import get_settings
+from app.utils.helpers import json_dumps, json_loads, utc_timestamp
+from app.services.vector_sidecar import QuantizedVectorSidecar
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Imported once here rather than per service construction; a missing or broken
+# install leaves chromadb as None and the service falls back to basic memory
+try:
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+    _CHROMA_IMPORT_ERROR = None
+except Exception as e:
+    chromadb = None
+    ChromaSettings = None
+    _CHROMA_IMPORT_ERROR = e
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Resolved once at import instead of on every service construction
+CHROMA_ENABLED = getattr(settings, 'chroma_enabled', True)
+CHROMA_PERSIST_DIRECTORY = getattr(settings, 'chroma_persist_directory', './data/chroma')
+
+# Upper bound on results returned by a single semantic search
+MAX_SEARCH_RESULTS = 20
+
+# How long computed memory statistics are reused, in seconds
+STATS_CACHE_TTL = 5.0
+
+# Short-term memory: message IDs in a sorted set scored by time, payloads in a hash
+SHORT_TERM_MAX_MESSAGES = 100
+SHORT_TERM_TTL = 86400  # 24 hours
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# user_id -> statistics, dropped STATS_CACHE_TTL seconds after being computed
+_stats_cache = TTLCache(maxsize=2048, ttl=STATS_CACHE_TTL)
+_stats_cache_lock = threading.Lock()
+
+# Users whose memory status this process logged recently (bounded, re-logged after a day)
+_logged_users = TTLCache(maxsize=4096, ttl=86400)
+_logged_users_lock = threading.Lock()
+
+# Repeat detection: a memory whose normalized text exactly matches one the same
+# user stored within the last DUPLICATE_WINDOW seconds is not stored again.
+# Any edit, however small, is stored, since it may be a correction.
+DUPLICATE_WINDOW = 3600
+
+# (user_id, normalized text digest) -> memory_id of recently stored memories
+_recent_memories = TTLCache(maxsize=16384, ttl=DUPLICATE_WINDOW)
+_recent_memories_lock = threading.Lock()
+
+def _content_digest(text: str) -> str:
+    """128-bit non-cryptographic digest of a text, for content-keyed caches"""
+    data = text.encode()
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _repeat_digest(text: str) -> str:
+    """Digest of a text with case and whitespace normalized, for repeat detection"""
+    return _content_digest(" ".join(text.lower().split()))
+
+def _normalize_embedding(embedding: List[float]) -> List[float]:
+    """Scale an embedding to unit length so inner product equals cosine similarity"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    vector /= np.linalg.norm(vector) + 1e-12
+    return vector.tolist()
+
+def _tokenize(text: str) -> set:
+    """Lowercased word set used for keyword matching in fallback memory"""
+    return set(_TOKEN_RE.findall(text.lower()))
+
+def _query_digest(query: str) -> str:
+    """Short non-cryptographic digest of a query, used only as an embedding cache key"""
+    data = query.encode()
+    if xxhash is not None:
+        return f"{xxhash.xxh3_64_intdigest(data) & 0xFFFFFFFF:08x}"
+    return hashlib.blake2b(data, digest_size=4).hexdigest()
+
+@lru_cache(maxsize=1)
+def _get_redis_pool() -> redis.BlockingConnectionPool:
+    """
+    Get the process-wide Redis connection pool.
+    
+    Every memory service shares this pool, so per-user service construction
+    reuses open connections instead of paying a new TCP handshake each time.
+    """
+    return redis.BlockingConnectionPool.from_url(
+        settings.redis_url,
+        max_connections=100,
+        timeout=1.0,
+        decode_responses=True,
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        retry_on_timeout=True
+    )
+
+@lru_cache(maxsize=1)
+def _get_async_redis_pool() -> redis.asyncio.BlockingConnectionPool:
+    """Get the process-wide asyncio Redis connection pool (used from the event loop)"""
+    return redis.asyncio.BlockingConnectionPool.from_url(
+        settings.redis_url,
+        max_connections=100,
+        timeout=1.0,
+        decode_responses=True,
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        retry_on_timeout=True
+    )
+
+@lru_cache(maxsize=4)
+def _get_chroma_client(persist_dir: str):
+    """
+    Get the shared ChromaDB client for a persistence directory.
+    
+    Opening a PersistentClient re-initializes its sqlite store, so all users
+    share one client and only their collections differ.
+    """
+    return chromadb.PersistentClient(
+        path=persist_dir,
+        settings=ChromaSettings(
+            anonymized_telemetry=False,
+            allow_reset=True
+        )
+    )
+
+@lru_cache(maxsize=4)
+def _known_collections(persist_dir: str) -> set:
+    """
+    Get the cached set of collection names in a persistence directory.
+    
+    Listed once per process so service construction can pick get vs. create
+    without a failed lookup per user; new collections are added as they are created.
+    """
+    collections = _get_chroma_client(persist_dir).list_collections()
+    return {getattr(collection, 'name', collection) for collection in collections}
+
 class IntelligentMemoryService:
     """
     Enhanced memory service that provides semantic understanding and long-term memory.
@@ -26,8 +172,10 @@ class IntelligentMemoryService:
         self.user_id = user_id
         self.collection = None
         self.redis_client = None
+        self.async_redis = None
         self.chroma_available = False
         self.chroma_client = None
+        self.vector_sidecar = None
         
         # Initialize semantic memory (ChromaDB) with graceful fallback
         self._initialize_semantic_memory()
@@ -45,61 +193,61 @@ class IntelligentMemoryService:
         This creates a vector database that can understand meaning and context,
         allowing Jobo to find related conversations even when different words are used.
         """
-        chroma_enabled = getattr(settings, 'chroma_enabled', True)
-        if not chroma_enabled:
+        if not CHROMA_ENABLED:
             logger.info("🧠 Semantic memory disabled via configuration")
             self.chroma_available = False
             return
         
+        if chromadb is None:
+            logger.warning(f"📦 ChromaDB not available: {_CHROMA_IMPORT_ERROR}")
+            logger.info("💡 To enable semantic memory, install: pip install chromadb")
+            logger.info("🔄 Running with basic memory only")
+            self._initialize_fallback_semantic_memory()
+            return
+        
         try:
-            logger.info(f"🧠 Initializing semantic memory for user {self.user_id}")
+            logger.debug("🧠 Initializing semantic memory for user %s", self.user_id)
             
-            import chromadb
-            from chromadb.config import Settings as ChromaSettings
-            
-            # Initialize ChromaDB client with persistence
-            persist_dir = getattr(settings, 'chroma_persist_directory', './data/chroma')
-            
-            self.chroma_client = chromadb.PersistentClient(
-                path=persist_dir,
-                settings=ChromaSettings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
-            )
+            # Reuse the shared ChromaDB client for this persistence directory
+            persist_dir = CHROMA_PERSIST_DIRECTORY
+            self.chroma_client = _get_chroma_client(persist_dir)
             
             # Get or create user-specific collection
             collection_name = f"user_{self.user_id}_memories"
-            try:
-                self.collection = self.chroma_client.get_collection(collection_name)
-                logger.debug(f"📚 Loaded existing memory collection: {collection_name}")
-            except Exception:
-                # Create new collection with optimized settings
-                self.collection = self.chroma_client.create_collection(
+            known_collections = _known_collections(persist_dir)
+            self.collection = None
+            if collection_name in known_collections:
+                try:
+                    self.collection = self.chroma_client.get_collection(collection_name)
+                    logger.debug("📚 Loaded existing memory collection: %s", collection_name)
+                except Exception as e:
+                    # Deleted since it was listed: forget it and recreate it below
+                    logger.warning("📚 Memory collection %s is no longer available, recreating: %s", collection_name, e)
+                    known_collections.discard(collection_name)
+            
+            if self.collection is None:
+                # Create new collection with optimized settings (tolerates a
+                # concurrent creation by another worker)
+                self.collection = self.chroma_client.get_or_create_collection(
                     name=collection_name,
                     metadata={
-                        "hnsw:space": "cosine",  # Use cosine similarity for semantic search
-                        "hnsw:construction_ef": 200,  # Higher quality index
-                        "hnsw:M": 16  # Good balance of speed and accuracy
+                        "hnsw:space": "ip",  # Inner product on unit-length embeddings (cosine similarity)
+                        "hnsw:construction_ef": settings.chroma_hnsw_construction_ef,
+                        "hnsw:M": settings.chroma_hnsw_m,
+                        # Keep the search beam at least twice the largest result set
+                        "hnsw:search_ef": max(settings.chroma_hnsw_search_ef, 2 * MAX_SEARCH_RESULTS)
                     }
                 )
-                logger.info(f"✨ Created new memory collection: {collection_name}")
+                known_collections.add(collection_name)
+                logger.info("✨ Created new memory collection: %s", collection_name)
             
-            self.chroma_available = True
-            logger.info(f"✅ Semantic memory initialized successfully")
-            
-            # Get collection statistics
-            try:
-                count = self.collection.count()
-                logger.info(f"📊 Memory collection contains {count} stored memories")
-            except Exception:
-                logger.debug("Could not get memory count")
+            # Compact int8 copy of the collection's embeddings for fast search
+            self.vector_sidecar = QuantizedVectorSidecar(
+                os.path.join(persist_dir, "sidecar", collection_name)
+            )
             
-        except ImportError as e:
-            logger.warning(f"📦 ChromaDB not available: {e}")
-            logger.info("💡 To enable semantic memory, install: pip install chromadb")
-            logger.info("🔄 Running with basic memory only")
-            self._initialize_fallback_semantic_memory()
+            self.chroma_available = True
+            logger.debug("✅ Semantic memory initialized successfully")
             
         except Exception as e:
             logger.error(f"❌ Failed to initialize semantic memory: {e}")
@@ -111,6 +259,7 @@ class IntelligentMemoryService:
         self.collection = None
         self.chroma_available = False
         self.chroma_client = None
+        self.vector_sidecar = None
         logger.info("🔧 Semantic memory fallback initialized")
     
     def _initialize_short_term_memory(self):
@@ -121,28 +270,26 @@ class IntelligentMemoryService:
         to maintain conversation flow and immediate context awareness.
         """
         try:
-            logger.info("🧠 Initializing short-term memory (Redis)")
-            
-            # Connect to Redis with connection pooling
-            self.redis_client = redis.from_url(
-                settings.redis_url,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True
-            )
+            logger.debug("🧠 Initializing short-term memory (Redis)")
+            
+            # Connect to Redis through the shared connection pool
+            self.redis_client = redis.Redis(connection_pool=_get_redis_pool())
             
             # Test the connection
             self.redis_client.ping()
-            logger.info("✅ Short-term memory (Redis) connected successfully")
+            logger.debug("✅ Short-term memory (Redis) connected successfully")
+            
+            # Async client for callers running on the event loop (connects lazily)
+            self.async_redis = redis.asyncio.Redis(connection_pool=_get_async_redis_pool())
             
             # Set up memory expiration policies
             self._setup_memory_expiration()
             
         except Exception as e:
-            logger.warning(f"❌ Redis connection failed: {e}")
+            logger.warning("❌ Redis connection failed: %s", e)
             logger.info("🔄 Running without short-term memory - conversations won't persist between sessions")
             self.redis_client = None
+            self.async_redis = None
     
     def _setup_memory_expiration(self):
         """Set up automatic expiration for memory management"""
@@ -150,10 +297,9 @@ class IntelligentMemoryService:
             return
         
         try:
-            # Set default expiration for conversation keys
-            conversation_key = f"conversation:{self.user_id}"
-            if self.redis_client.exists(conversation_key):
-                self.redis_client.expire(conversation_key, 86400)  # 24 hours
+            # Set default expiration for conversation keys (no-op if missing)
+            for conversation_key in self._conversation_keys():
+                self.redis_client.expire(conversation_key, SHORT_TERM_TTL)
                 
             # Set expiration for session data
             session_key = f"session:{self.user_id}"
@@ -164,17 +310,31 @@ class IntelligentMemoryService:
             logger.debug(f"Could not set memory expiration: {e}")
     
     def _log_memory_status(self):
-        """Log the memory system initialization status"""
-        logger.info(f"🧠 Memory System Status for user {self.user_id}:")
-        logger.info(f"  Semantic Memory (ChromaDB): {'✅ Active' if self.chroma_available else '❌ Disabled'}")
-        logger.info(f"  Short-term Memory (Redis): {'✅ Active' if self.redis_client else '❌ Disabled'}")
+        """
+        Log the memory system initialization status.
         
-        if self.chroma_available:
+        Services are constructed per request, so the status is logged once per
+        user per process, and the collection is only counted at DEBUG level.
+        """
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        with _logged_users_lock:
+            if self.user_id in _logged_users:
+                return
+            _logged_users[self.user_id] = True
+        
+        logger.info(
+            "🧠 Memory System Status for user %s: Semantic Memory (ChromaDB): %s, Short-term Memory (Redis): %s",
+            self.user_id,
+            "✅ Active" if self.chroma_available else "❌ Disabled",
+            "✅ Active" if self.redis_client else "❌ Disabled"
+        )
+        
+        if self.chroma_available and logger.isEnabledFor(logging.DEBUG):
             try:
-                count = self.collection.count()
-                logger.info(f"  Stored Memories: {count}")
+                logger.debug("  Stored Memories: %d", self.collection.count())
             except Exception:
-                logger.info(f"  Stored Memories: Unknown")
+                logger.debug("  Stored Memories: Unknown")
     
     def add_memory(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -190,17 +350,20 @@ class IntelligentMemoryService:
         Returns:
             Memory ID for reference
         """
-        if metadata is None:
-            metadata = {}
-        
-        # Add timestamp and user context
-        enhanced_metadata = {
-            **metadata,
-            "user_id": self.user_id,
-            "timestamp": datetime.utcnow().isoformat(),
-            "text_length": len(text),
-            "memory_type": "conversation"
-        }
+        # Add timestamp and user context (copy so the caller's dict is untouched)
+        enhanced_metadata = metadata.copy() if metadata else {}
+        enhanced_metadata["user_id"] = self.user_id
+        enhanced_metadata["timestamp"] = utc_timestamp()
+        enhanced_metadata["text_length"] = len(text)
+        enhanced_metadata["memory_type"] = "conversation"
+        
+        # Skip exact repeats of something this user stored recently
+        digest = _repeat_digest(text)
+        with _recent_memories_lock:
+            recent_id = _recent_memories.get((self.user_id, digest))
+        if recent_id is not None:
+            logger.debug(f"♻️ Skipped repeated memory, reusing {recent_id}")
+            return recent_id
         
         # Generate unique memory ID
         memory_id = f"mem_{self.user_id}_{uuid.uuid4().hex[:12]}"
@@ -212,7 +375,9 @@ class IntelligentMemoryService:
                 embedding_service = get_embedding_service()
                 
                 # Generate semantic embedding
-                embedding = embedding_service.generate_embedding(text, cache_key=f"memory_{memory_id}")
+                embedding = _normalize_embedding(
+                    embedding_service.generate_embedding(text, cache_key=f"memory_{_content_digest(text)}")
+                )
                 
                 # Store in semantic memory
                 self.collection.add(
@@ -221,17 +386,24 @@ class IntelligentMemoryService:
                     metadatas=[enhanced_metadata],
                     ids=[memory_id]
                 )
+                self._add_to_vector_sidecar(memory_id, embedding)
+                self._remember_memory(digest, memory_id)
                 
                 logger.debug(f"💾 Stored semantic memory: {memory_id}")
                 return memory_id
                 
             except Exception as e:
                 logger.error(f"❌ Failed to store semantic memory: {e}")
-                return self._store_fallback_memory(text, enhanced_metadata, memory_id)
+                return self._store_fallback_memory(text, enhanced_metadata, memory_id, digest)
         else:
-            return self._store_fallback_memory(text, enhanced_metadata, memory_id)
+            return self._store_fallback_memory(text, enhanced_metadata, memory_id, digest)
+    
+    def _remember_memory(self, digest: str, memory_id: str):
+        """Record a stored memory for repeat detection"""
+        with _recent_memories_lock:
+            _recent_memories[(self.user_id, digest)] = memory_id
     
-    def _store_fallback_memory(self, text: str, metadata: Dict[str, Any], memory_id: str) -> str:
+    def _store_fallback_memory(self, text: str, metadata: Dict[str, Any], memory_id: str, digest: Optional[str] = None) -> str:
         """Store memory when semantic storage isn't available"""
         if self.redis_client:
             try:
@@ -240,9 +412,12 @@ class IntelligentMemoryService:
                 memory_data = {
                     "text": text,
                     "metadata": metadata,
-                    "id": memory_id
+                    "id": memory_id,
+                    "tokens": sorted(_tokenize(text))  # Pre-tokenized for keyword search
                 }
-                self.redis_client.setex(fallback_key, 604800, json.dumps(memory_data))  # 7 days
+                self.redis_client.setex(fallback_key, 604800, json_dumps(memory_data))  # 7 days
+                if digest is not None:
+                    self._remember_memory(digest, memory_id)
                 logger.debug(f"💾 Stored fallback memory in Redis: {memory_id}")
             except Exception as e:
                 logger.warning(f"Failed to store fallback memory: {e}")
@@ -274,15 +449,19 @@ class IntelligentMemoryService:
             embedding_service = get_embedding_service()
             
             # Generate query embedding
-            query_embedding = embedding_service.generate_embedding(query, cache_key=f"search_{hashlib.md5(query.encode()).hexdigest()[:8]}")
-            
-            # Search semantic memory
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=min(n_results, 20),  # Cap at 20 for performance
-                include=['metadatas', 'documents', 'distances']
+            query_embedding = _normalize_embedding(
+                embedding_service.generate_embedding(query, cache_key=f"search_{_query_digest(query)}")
             )
             
+            # Search semantic memory, preferring the quantized sidecar index
+            results = self._query_vector_sidecar(query_embedding, n_results)
+            if results is None:
+                results = self.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=min(n_results, MAX_SEARCH_RESULTS),  # Cap for performance
+                    include=['metadatas', 'documents', 'distances']
+                )
+            
             # Filter by similarity threshold and convert distances to similarities
             filtered_results = self._filter_and_convert_results(results, similarity_threshold)
             
@@ -293,6 +472,60 @@ class IntelligentMemoryService:
             logger.error(f"❌ Semantic search failed: {e}")
             return self._search_fallback_memories(query, n_results)
     
+    def _add_to_vector_sidecar(self, memory_id: str, embedding: List[float]):
+        """Mirror a stored embedding into the quantized sidecar index"""
+        if not self.vector_sidecar:
+            return
+        
+        try:
+            self.vector_sidecar.add(memory_id, embedding)
+        except Exception as e:
+            logger.warning(f"Failed to update quantized memory index: {e}")
+    
+    def _query_vector_sidecar(self, query_embedding: List[float], n_results: int) -> Optional[Dict[str, Any]]:
+        """
+        Search the quantized sidecar index and fetch the matching memories from ChromaDB.
+        
+        For small collections an exact scan of the int8 matrix beats walking the
+        HNSW graph, so the sidecar is only used below the configured size limit.
+        
+        Returns results in ChromaDB query format, or None when the caller should
+        query ChromaDB instead (collection too large, or not fully mirrored).
+        """
+        if not self.vector_sidecar:
+            return None
+        
+        try:
+            stored = self.vector_sidecar.count()
+            if stored == 0 or stored >= settings.vector_sidecar_max_memories:
+                return None
+            if stored != self.collection.count():
+                return None
+            
+            matches = self.vector_sidecar.search(query_embedding, min(n_results, MAX_SEARCH_RESULTS))
+            if not matches:
+                return None
+            
+            records = self.collection.get(
+                ids=[memory_id for memory_id, _ in matches],
+                include=['documents', 'metadatas']
+            )
+            found = {
+                memory_id: (doc, meta)
+                for memory_id, doc, meta in zip(records['ids'], records['documents'], records['metadatas'])
+            }
+            hits = [(memory_id, similarity) for memory_id, similarity in matches if memory_id in found]
+            
+            return {
+                "documents": [[found[memory_id][0] for memory_id, _ in hits]],
+                "metadatas": [[found[memory_id][1] for memory_id, _ in hits]],
+                "distances": [[1.0 - similarity for _, similarity in hits]]
+            }
+            
+        except Exception as e:
+            logger.debug(f"Quantized memory search unavailable: {e}")
+            return None
+    
     def _filter_and_convert_results(self, results: Dict[str, Any], similarity_threshold: float) -> Dict[str, Any]:
         """Filter results by similarity threshold and convert distances to similarities"""
         if not results.get('distances') or not results['distances'][0]:
@@ -300,26 +533,20 @@ class IntelligentMemoryService:
         
         documents = results.get('documents', [[]])[0]
         metadatas = results.get('metadatas', [[]])[0]
-        distances = results.get('distances', [[]])[0]
+        distances = np.asarray(results['distances'][0], dtype=np.float64)
         
-        # Convert distances to similarities (ChromaDB uses cosine distance)
-        similarities = [1.0 - distance for distance in distances]
+        # Convert distances to similarities (cosine and inner-product distances
+        # are both 1 - similarity for unit-length embeddings)
+        similarities = 1.0 - distances
         
-        # Filter by threshold
-        filtered_docs = []
-        filtered_metas = []
-        filtered_sims = []
-        
-        for doc, meta, sim in zip(documents, metadatas, similarities):
-            if sim >= similarity_threshold:
-                filtered_docs.append(doc)
-                filtered_metas.append(meta)
-                filtered_sims.append(sim)
+        # Filter by threshold, most similar first
+        keep = np.flatnonzero(similarities >= similarity_threshold)
+        keep = keep[np.argsort(-similarities[keep], kind='stable')]
         
         return {
-            "documents": [filtered_docs],
-            "metadatas": [filtered_metas],
-            "similarities": filtered_sims
+            "documents": [[documents[i] for i in keep]],
+            "metadatas": [[metadatas[i] for i in keep]],
+            "similarities": similarities[keep].tolist()
         }
     
     def _search_fallback_memories(self, query: str, n_results: int) -> Dict[str, Any]:
@@ -332,29 +559,29 @@ class IntelligentMemoryService:
             pattern = f"fallback_memory:{self.user_id}:*"
             keys = self.redis_client.keys(pattern)
             
-            matching_memories = []
-            query_lower = query.lower()
+            query_tokens = _tokenize(query)
+            scored_memories = []
             
-            for key in keys[:50]:  # Limit search scope
+            keys = keys[:50]  # Limit search scope
+            for raw in (self.redis_client.mget(keys) if keys else []):
                 try:
-                    memory_data = json.loads(self.redis_client.get(key))
-                    text = memory_data.get('text', '').lower()
+                    memory_data = json_loads(raw)
                     
-                    # Simple keyword matching
-                    if any(word in text for word in query_lower.split()):
-                        matching_memories.append(memory_data)
+                    # Score by shared words; older entries have no stored tokens
+                    tokens = memory_data.get('tokens')
+                    tokens = set(tokens) if tokens is not None else _tokenize(memory_data.get('text', ''))
+                    score = len(query_tokens & tokens)
+                    if score:
+                        scored_memories.append((score, memory_data))
                         
                 except Exception:
                     continue
             
-            # Sort by relevance (simple word count matching)
-            matching_memories.sort(
-                key=lambda x: sum(word in x.get('text', '').lower() for word in query_lower.split()),
-                reverse=True
-            )
+            # Sort by relevance (number of shared words)
+            scored_memories.sort(key=lambda x: x[0], reverse=True)
             
             # Format results
-            results = matching_memories[:n_results]
+            results = [memory_data for _, memory_data in scored_memories[:n_results]]
             return {
                 "documents": [[mem.get('text', '') for mem in results]],
                 "metadatas": [[mem.get('metadata', {}) for mem in results]],
@@ -365,7 +592,11 @@ class IntelligentMemoryService:
             logger.error(f"Fallback memory search failed: {e}")
             return {"documents": [[]], "metadatas": [[]], "similarities": []}
     
-    def get_short_term_memory(self, limit: int = 10) -> List[Dict[str, Any]]:
+    def _conversation_keys(self) -> Tuple[str, str]:
+        """Redis keys for the short-term message index (sorted set) and payloads (hash)"""
+        return f"conversation_index:{self.user_id}", f"conversation_payload:{self.user_id}"
+    
+    def get_short_term_memory(self, limit: int = 10, since: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Get recent conversation messages from short-term memory.
         
@@ -373,6 +604,7 @@ class IntelligentMemoryService:
         
         Args:
             limit: Maximum number of recent messages to retrieve
+            since: Optional Unix timestamp; only messages stored after it are returned
             
         Returns:
             List of recent conversation messages
@@ -382,24 +614,85 @@ class IntelligentMemoryService:
             return []
         
         try:
-            conversation_key = f"conversation:{self.user_id}"
-            messages = self.redis_client.lrange(conversation_key, 0, limit - 1)
+            index_key, payload_key = self._conversation_keys()
+            # Newest first from the index, time filtering happens server-side
+            if since is None:
+                message_ids = self.redis_client.zrevrange(index_key, 0, limit - 1)
+            else:
+                message_ids = self.redis_client.zrevrangebyscore(index_key, "+inf", since, start=0, num=limit)
+            if not message_ids:
+                return []
+            
+            message_ids.reverse()
+            payloads = self.redis_client.hmget(payload_key, message_ids)
+            parsed_messages = self._parse_messages([p for p in payloads if p is not None])
+            
+            logger.debug(f"📋 Retrieved {len(parsed_messages)} recent messages")
+            return parsed_messages
             
-            # Parse and return messages in chronological order
+        except Exception as e:
+            logger.error(f"❌ Failed to get short-term memory: {e}")
+            return []
+    
+    def _parse_messages(self, messages: List[str]) -> List[Dict[str, Any]]:
+        """Decode stored conversation messages"""
+        try:
+            return [json_loads(msg) for msg in messages]
+        except json.JSONDecodeError:
+            # Skip malformed entries only when one is actually present
             parsed_messages = []
-            for msg in reversed(messages):  # Reverse to get chronological order
+            for msg in messages:
                 try:
-                    parsed_messages.append(json.loads(msg))
+                    parsed_messages.append(json_loads(msg))
                 except json.JSONDecodeError:
                     continue
-            
-            logger.debug(f"📋 Retrieved {len(parsed_messages)} recent messages")
             return parsed_messages
+    
+    async def aget_short_term_memory(self, limit: int = 10, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Async variant of get_short_term_memory that doesn't block the event loop"""
+        if not self.async_redis:
+            logger.debug("Short-term memory not available")
+            return []
+        
+        try:
+            index_key, payload_key = self._conversation_keys()
+            if since is None:
+                message_ids = await self.async_redis.zrevrange(index_key, 0, limit - 1)
+            else:
+                message_ids = await self.async_redis.zrevrangebyscore(index_key, "+inf", since, start=0, num=limit)
+            if not message_ids:
+                return []
+            
+            message_ids.reverse()
+            payloads = await self.async_redis.hmget(payload_key, message_ids)
+            return self._parse_messages([p for p in payloads if p is not None])
             
         except Exception as e:
             logger.error(f"❌ Failed to get short-term memory: {e}")
             return []
     
+    async def asearch_memories(self, query: str, n_results: int = 5, similarity_threshold: float = 0.7) -> Dict[str, Any]:
+        """
+        Async variant of search_memories.
+        
+        Embedding generation and ChromaDB are synchronous, so the search runs on
+        a worker thread and concurrent users' searches overlap instead of queueing.
+        """
+        return await asyncio.to_thread(self.search_memories, query, n_results, similarity_threshold)
+    
+    async def aget_memory_context(self, query: str, n_results: int = 5, similarity_threshold: float = 0.7, limit: int = 10) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Fetch related long-term memories and recent messages concurrently.
+        
+        Returns:
+            Tuple of (search_memories results, recent conversation messages)
+        """
+        memories, recent_messages = await asyncio.gather(
+            self.asearch_memories(query, n_results, similarity_threshold),
+            self.aget_short_term_memory(limit)
+        )
+        return memories, recent_messages
+    
     def add_to_short_term_memory(self, message: Dict[str, Any]):
         """
         Add a message to short-term conversational memory.
@@ -415,28 +708,79 @@ class IntelligentMemoryService:
             return
         
         try:
-            conversation_key = f"conversation:{self.user_id}"
+            index_key, payload_key = self._conversation_keys()
             
             # Add timestamp if not present
             if 'timestamp' not in message:
                 message['timestamp'] = datetime.utcnow().isoformat()
             
-            # Store message
-            self.redis_client.lpush(conversation_key, json.dumps(message))
+            # Index, store, trim and expire in one atomic round trip
+            pipe = self.redis_client.pipeline()
+            self._queue_short_term_write(pipe, index_key, payload_key, message)
+            stale_ids = pipe.execute()[2]
+            
+            # Payloads of messages trimmed from the index
+            if stale_ids:
+                self.redis_client.hdel(payload_key, *stale_ids)
+            
+            logger.debug(f"💬 Added message to short-term memory")
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to add to short-term memory: {e}")
+    
+    async def aadd_to_short_term_memory(self, message: Dict[str, Any]):
+        """Async variant of add_to_short_term_memory, sent as one pipelined round trip"""
+        if not self.async_redis:
+            logger.debug("Short-term memory not available, skipping storage")
+            return
+        
+        try:
+            index_key, payload_key = self._conversation_keys()
             
-            # Maintain conversation length (keep last 100 messages)
-            self.redis_client.ltrim(conversation_key, 0, 99)
+            # Add timestamp if not present
+            if 'timestamp' not in message:
+                message['timestamp'] = datetime.utcnow().isoformat()
             
-            # Set expiration
-            self.redis_client.expire(conversation_key, 86400)  # 24 hours
+            async with self.async_redis.pipeline() as pipe:
+                self._queue_short_term_write(pipe, index_key, payload_key, message)
+                stale_ids = (await pipe.execute())[2]
+            
+            if stale_ids:
+                await self.async_redis.hdel(payload_key, *stale_ids)
             
             logger.debug(f"💬 Added message to short-term memory")
             
         except Exception as e:
             logger.error(f"❌ Failed to add to short-term memory: {e}")
     
+    @staticmethod
+    def _queue_short_term_write(pipe, index_key: str, payload_key: str, message: Dict[str, Any]):
+        """
+        Queue the commands that store one short-term message on a pipeline.
+        
+        The third queued command returns the IDs trimmed from the index, whose
+        payloads the caller removes from the hash.
+        """
+        message_id = uuid.uuid4().hex[:16]
+        pipe.zadd(index_key, {message_id: time.time()})
+        pipe.hset(payload_key, message_id, json_dumps(message))
+        pipe.zrange(index_key, 0, -(SHORT_TERM_MAX_MESSAGES + 1))
+        pipe.zremrangebyrank(index_key, 0, -(SHORT_TERM_MAX_MESSAGES + 1))
+        pipe.expire(index_key, SHORT_TERM_TTL)
+        pipe.expire(payload_key, SHORT_TERM_TTL)
+    
     def get_memory_statistics(self) -> Dict[str, Any]:
-        """Get statistics about the memory system for this user"""
+        """
+        Get statistics about the memory system for this user.
+        
+        Results are reused for STATS_CACHE_TTL seconds, so repeated calls from
+        status endpoints don't re-count the collection and conversation each time.
+        """
+        with _stats_cache_lock:
+            cached = _stats_cache.get(self.user_id)
+        if cached is not None:
+            return dict(cached)
+        
         stats = {
             "user_id": self.user_id,
             "semantic_memory_available": self.chroma_available,
@@ -456,8 +800,8 @@ class IntelligentMemoryService:
         # Get short-term memory statistics
         if self.redis_client:
             try:
-                conversation_key = f"conversation:{self.user_id}"
-                stats["short_term_memory_count"] = self.redis_client.llen(conversation_key)
+                index_key, _ = self._conversation_keys()
+                stats["short_term_memory_count"] = self.redis_client.zcard(index_key)
             except Exception as e:
                 logger.debug(f"Could not get short-term memory count: {e}")
         
@@ -469,7 +813,9 @@ class IntelligentMemoryService:
         else:
             stats["memory_system_health"] = "basic"
         
-        return stats
+        with _stats_cache_lock:
+            _stats_cache[self.user_id] = stats
+        return dict(stats)
     
     def clear_short_term_memory(self):
         """Clear the short-term conversation memory"""
@@ -477,11 +823,46 @@ class IntelligentMemoryService:
             return
         
         try:
-            conversation_key = f"conversation:{self.user_id}"
-            self.redis_client.delete(conversation_key)
+            self.redis_client.delete(*self._conversation_keys())
+            with _stats_cache_lock:
+                _stats_cache.pop(self.user_id, None)
             logger.info(f"🧹 Cleared short-term memory for user {self.user_id}")
         except Exception as e:
             logger.error(f"Failed to clear short-term memory: {e}")
 
+# Shared services (bounded): fully connected ones are kept for an hour, ones
+# that started without Redis or ChromaDB only until the next reconnect attempt
+DEGRADED_RETRY_INTERVAL = 60
+_memory_services = TTLCache(maxsize=2048, ttl=3600)
+_degraded_memory_services = TTLCache(maxsize=2048, ttl=DEGRADED_RETRY_INTERVAL)
+_memory_services_lock = threading.Lock()
+
+def _is_fully_connected(service: IntelligentMemoryService) -> bool:
+    """Whether a service has every memory backend this process can provide"""
+    semantic_expected = CHROMA_ENABLED and chromadb is not None
+    return service.redis_client is not None and (service.chroma_available or not semantic_expected)
+
+def get_memory_service(user_id: str) -> IntelligentMemoryService:
+    """
+    Shared memory service for a user.
+    
+    The assistant, consolidation and proactive services all use the same
+    instance instead of each opening the user's collection separately.
+    A service that started without Redis or ChromaDB is only reused for
+    DEGRADED_RETRY_INTERVAL seconds, after which it is rebuilt so it can
+    connect again.
+    """
+    with _memory_services_lock:
+        service = _memory_services.get(user_id) or _degraded_memory_services.get(user_id)
+    if service is not None:
+        return service
+    
+    # Constructed outside the lock, a slow Redis ping only delays this user
+    service = IntelligentMemoryService(user_id)
+    services = _memory_services if _is_fully_connected(service) else _degraded_memory_services
+    
+    with _memory_services_lock:
+        return services.setdefault(user_id, service)
+
 # For backward compatibility
 MemoryService = IntelligentMemoryService 
\ No newline at end of file
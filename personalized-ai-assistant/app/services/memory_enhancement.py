@@ -1,14 +1,108 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from datetime import datetime, timedelta
 import anthropic
-from app.services.memory import IntelligentMemoryService
+import numpy as np
+from cachetools import TTLCache
+from functools import lru_cache
+from app.services.memory import get_memory_service
 from app.config import get_settings
+from app.utils.helpers import json_loads
+import asyncio
+import hashlib
 import logging
 import json
+import re
+import threading
+import time
+
+try:
+    from sklearn.cluster import MiniBatchKMeans
+except ImportError:
+    MiniBatchKMeans = None
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+@lru_cache()
+def _get_claude_client() -> Optional[anthropic.AsyncAnthropic]:
+    """Async Claude client shared by every user's service (one connection pool)"""
+    if not settings.anthropic_api_key:
+        return None
+    return anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+
+# Embedding clusters: memories per cluster shown to Claude for labelling, and
+# mean member-to-centroid cosine similarity for high/medium strength
+CLUSTER_REPRESENTATIVES = 3
+CLUSTER_STRENGTH_THRESHOLDS = (0.75, 0.55)
+
+# Upper bound on clusters per request (each is labelled by its own Claude
+# call), and how many of those labelling calls run at once
+MAX_CLUSTERS = 10
+CLUSTER_LABEL_CONCURRENCY = 4
+
+# Message Batches polling for background cluster consolidation, in seconds
+BATCH_POLL_INTERVAL = 15
+BATCH_MAX_WAIT = 3600
+
+# Parsed Claude responses keyed by a SHA-256 of the request, shared across users
+# so retried or repeated consolidations of the same content cost no API call.
+# Replies that fail to parse or were cut off at max_tokens are never cached.
+_completion_cache = TTLCache(maxsize=4096, ttl=86400)
+
+# First JSON object or array in a response, ignoring text or code fences around it
+_JSON_BLOCK_RE = re.compile(r'(\{.*\}|\[.*\])', re.DOTALL)
+
+# Pulls the summary string out of a combined response that isn't valid JSON
+_SUMMARY_FIELD_RE = re.compile(r'"summary"\s*:\s*("(?:[^"\\]|\\.)*")', re.DOTALL)
+
+def _parse_llm_json(text: str) -> Any:
+    """
+    Parse JSON from a Claude response.
+    
+    Raises:
+        json.JSONDecodeError: if neither the response nor its first
+        {...} / [...] block is valid JSON
+    """
+    try:
+        return json_loads(text)
+    except json.JSONDecodeError:
+        match = _JSON_BLOCK_RE.search(text)
+        if not match:
+            raise
+        return json_loads(match.group(1))
+
+class _UnparsedResponse(ValueError):
+    """A Claude reply its parser rejected; keeps the raw text for fallbacks"""
+    
+    def __init__(self, text: str):
+        super().__init__("Unparseable Claude response")
+        self.text = text
+
+def _parse_summary_response(text: str) -> Tuple[str, Dict[str, Any]]:
+    """Split a combined summary response into (summary, metadata)"""
+    metadata = _parse_llm_json(text)
+    if not isinstance(metadata, dict):
+        raise ValueError("Summary response is not a JSON object")
+    
+    summary = metadata.pop("summary", None)
+    if not isinstance(summary, str) or not summary.strip():
+        raise ValueError("Summary response has no summary")
+    return summary.strip(), metadata
+
+def _parse_cluster_label(text: str) -> Dict[str, Any]:
+    """Parse a {"theme", "description"} cluster label"""
+    label = _parse_llm_json(text)
+    if not isinstance(label, dict):
+        raise ValueError("Cluster label is not a JSON object")
+    return label
+
+def _parse_cluster_list(text: str) -> List[Dict[str, Any]]:
+    """Parse a JSON list of clusters"""
+    clusters = _parse_llm_json(text)
+    if not isinstance(clusters, list):
+        raise ValueError("Cluster response is not a JSON list")
+    return clusters
+
 class MemoryConsolidationService:
     """
     Enhanced memory service that adds conversation summarization,
@@ -20,25 +114,27 @@ class MemoryConsolidationService:
     
     def __init__(self, user_id: str):
         self.user_id = user_id
-        self.memory_service = IntelligentMemoryService(user_id)
+        self.memory_service = get_memory_service(user_id)
         self.client = None
         self._initialize_claude_client()
     
     def _initialize_claude_client(self):
         """Initialize Claude client for summarization"""
         try:
-            if settings.anthropic_api_key:
-                self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+            self.client = _get_claude_client()
+            if self.client:
                 logger.debug("✅ Memory consolidation service initialized")
             else:
                 logger.warning("❌ Memory consolidation unavailable - no API key")
         except Exception as e:
             logger.error(f"❌ Failed to initialize memory consolidation: {e}")
     
-    def consolidate_conversation(self, conversation_messages: List[Dict[str, Any]]) -> Optional[str]:
+    async def consolidate_conversation(self, conversation_messages: List[Dict[str, Any]]) -> Optional[str]:
         """
         Consolidate a conversation into a meaningful summary for long-term storage.
         
+        The summary and metadata come back from a single Claude request.
+        
         Args:
             conversation_messages: List of conversation messages
             
@@ -52,15 +148,13 @@ class MemoryConsolidationService:
             # Create conversation text
             conversation_text = self._format_conversation(conversation_messages)
             
-            # Generate intelligent summary
-            summary = self._generate_conversation_summary(conversation_text)
+            # Generate intelligent summary and extract key insights and metadata
+            summary, metadata = await self._summarize_and_extract(conversation_text)
             
             if summary:
-                # Extract key insights and metadata
-                metadata = self._extract_conversation_metadata(conversation_text, summary)
-                
                 # Store consolidated memory
-                memory_id = self.memory_service.add_memory(
+                memory_id = await asyncio.to_thread(
+                    self.memory_service.add_memory,
                     text=summary,
                     metadata={
                         **metadata,
@@ -99,95 +193,116 @@ class MemoryConsolidationService:
         
         return "\n".join(formatted_lines)
     
-    def _generate_conversation_summary(self, conversation_text: str) -> Optional[str]:
-        """Generate an intelligent summary of the conversation"""
-        try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=500,
-                messages=[{
-                    "role": "user",
-                    "content": f"""Please create a comprehensive but concise summary of this conversation between a user and Jobo (an AI assistant). Focus on:
-
-1. Key topics discussed
-2. Important insights or learning points
-3. User's questions, interests, and preferences revealed
-4. Any patterns in communication style
-5. Actionable outcomes or next steps
-
-Conversation:
-{conversation_text}
-
-Summary:"""
-                }]
-            )
-            
-            return response.content[0].text.strip()
-            
-        except Exception as e:
-            logger.error(f"Failed to generate conversation summary: {e}")
-            return None
-    
-    def _extract_conversation_metadata(self, conversation_text: str, summary: str) -> Dict[str, Any]:
-        """Extract structured metadata from conversation"""
+    async def _summarize_and_extract(self, conversation_text: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Generate an intelligent summary and structured metadata in one request.
+        
+        Returns:
+            Tuple of (summary or None if failed, metadata)
+        """
         try:
-            response = self.client.messages.create(
+            return await self._cached_completion(
+                _parse_summary_response,
                 model="claude-3-5-sonnet-20241022",
-                max_tokens=300,
+                max_tokens=700,
                 messages=[{
                     "role": "user",
-                    "content": f"""Based on this conversation and its summary, extract key metadata in JSON format:
-
-Conversation: {conversation_text[:1000]}...
-Summary: {summary}
+                    "content": f"""Please analyze this conversation between a user and Jobo (an AI assistant) and respond with a single JSON object with these fields:
 
-Please provide JSON with these fields:
+- "summary": a comprehensive but concise summary focusing on key topics discussed, important insights or learning points, the user's questions, interests and preferences revealed, patterns in communication style, and actionable outcomes or next steps
 - "topics": list of main topics (max 5)
-- "user_interests": list of user interests revealed (max 3) 
+- "user_interests": list of user interests revealed (max 3)
 - "sentiment": overall sentiment (positive/neutral/negative)
 - "complexity": conversation complexity (simple/medium/complex)
 - "user_learning": what the user learned or was curious about
 - "communication_style": user's communication style observations
 
+Conversation:
+{conversation_text}
+
 JSON:"""
                 }]
             )
             
-            # Try to parse JSON response
-            metadata_text = response.content[0].text.strip()
+        except _UnparsedResponse as e:
+            response_text = e.text
+            
+        except Exception as e:
+            logger.error(f"Failed to summarize conversation: {e}")
+            return None, {"topics": ["general_conversation"]}
+        
+        # Fallback to the summary field alone with basic metadata
+        summary = None
+        match = _SUMMARY_FIELD_RE.search(response_text)
+        if match:
             try:
-                return json.loads(metadata_text)
+                summary = json.loads(match.group(1)).strip()
             except json.JSONDecodeError:
-                # Fallback to basic metadata
-                return {
-                    "topics": ["general_conversation"],
-                    "sentiment": "neutral",
-                    "complexity": "medium"
-                }
-                
+                pass
+        
+        if not summary:
+            logger.warning("Failed to parse conversation summary response")
+        
+        return summary or None, {
+            "topics": ["general_conversation"],
+            "sentiment": "neutral",
+            "complexity": "medium"
+        }
+    
+    async def _cached_completion(self, parse: Callable[[str], Any], **params) -> Any:
+        """
+        Create a Claude message and return its parsed text, reusing cached results of identical requests.
+        
+        Only replies that parse and weren't truncated at max_tokens are
+        cached, so a malformed reply is retried on the next call.
+        
+        Raises:
+            _UnparsedResponse: if parse rejects the reply
+        """
+        key = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).digest()
+        cached = _completion_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        response = await self.client.messages.create(**params)
+        text = response.content[0].text.strip()
+        try:
+            result = parse(text)
         except Exception as e:
-            logger.error(f"Failed to extract conversation metadata: {e}")
-            return {"topics": ["general_conversation"]}
+            raise _UnparsedResponse(text) from e
+        
+        if response.stop_reason != "max_tokens":
+            _completion_cache[key] = result
+        return result
     
-    def identify_memory_clusters(self, max_clusters: int = 10) -> List[Dict[str, Any]]:
+    async def identify_memory_clusters(self, max_clusters: int = 10) -> List[Dict[str, Any]]:
         """
         Identify clusters of related memories for better organization.
         
+        Args:
+            max_clusters: Most clusters to return, capped at MAX_CLUSTERS
+            
         Returns:
             List of memory clusters with their themes and member memories
         """
         if not self.memory_service.chroma_available:
             return []
         
+        max_clusters = max(1, min(max_clusters, MAX_CLUSTERS))
+        
         try:
             # Get all memories for this user
-            all_memories = self._get_all_user_memories()
+            all_memories, embeddings = await asyncio.to_thread(self._get_all_user_memories)
             
             if len(all_memories) < 3:
                 return []  # Need at least 3 memories to cluster
             
-            # Use Claude to identify thematic clusters
-            clusters = self._generate_memory_clusters(all_memories, max_clusters)
+            if MiniBatchKMeans is not None and embeddings is not None:
+                # Group by embedding locally, Claude only labels the clusters
+                clusters = await self._cluster_memory_embeddings(all_memories, embeddings, max_clusters)
+            else:
+                # Use Claude to identify thematic clusters
+                clusters = await self._generate_memory_clusters(all_memories, max_clusters)
             
             logger.info(f"🧠 Identified {len(clusters)} memory clusters")
             return clusters
@@ -196,16 +311,21 @@ JSON:"""
             logger.error(f"Failed to identify memory clusters: {e}")
             return []
     
-    def _get_all_user_memories(self) -> List[Dict[str, Any]]:
-        """Get all memories for clustering analysis"""
+    def _get_all_user_memories(self) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray]]:
+        """
+        Get all memories for clustering analysis.
+        
+        Returns:
+            Tuple of (memories, their embeddings as an (N, D) array or None)
+        """
         if not self.memory_service.collection:
-            return []
+            return [], None
         
         try:
             # Get all memories (limit for performance)
             results = self.memory_service.collection.get(
-                limit=100,
-                include=['documents', 'metadatas']
+                limit=500,
+                include=['documents', 'metadatas', 'embeddings']
             )
             
             memories = []
@@ -218,13 +338,111 @@ JSON:"""
                     'metadata': meta or {}
                 })
             
-            return memories
+            embeddings = results.get('embeddings')
+            if embeddings is None or len(embeddings) != len(memories):
+                return memories, None
+            
+            return memories, np.asarray(embeddings, dtype=np.float32)
             
         except Exception as e:
             logger.error(f"Failed to get all memories: {e}")
-            return []
+            return [], None
     
-    def _generate_memory_clusters(self, memories: List[Dict[str, Any]], max_clusters: int) -> List[Dict[str, Any]]:
+    async def _cluster_memory_embeddings(self, memories: List[Dict[str, Any]], embeddings: np.ndarray, max_clusters: int) -> List[Dict[str, Any]]:
+        """
+        Group memories with mini-batch k-means over their embeddings.
+        
+        Strength comes from how tightly members sit around their centroid, and
+        each cluster is named by a short Claude request over its most central
+        memories, at most CLUSTER_LABEL_CONCURRENCY at a time.
+        """
+        groups = await asyncio.to_thread(self._group_memory_embeddings, embeddings, max_clusters)
+        
+        label_slots = asyncio.Semaphore(CLUSTER_LABEL_CONCURRENCY)
+        
+        async def label(members: np.ndarray, index: int) -> Tuple[str, str]:
+            async with label_slots:
+                return await self._label_memory_cluster(memories, members, index)
+        
+        labels_text = await asyncio.gather(*(label(members, index) for index, (members, _) in enumerate(groups)))
+        
+        high, medium = CLUSTER_STRENGTH_THRESHOLDS
+        clusters = []
+        for (members, cohesion), (theme, description) in zip(groups, labels_text):
+            clusters.append({
+                'theme': theme,
+                'description': description,
+                'strength': "high" if cohesion >= high else "medium" if cohesion >= medium else "low",
+                'memories': [memories[i] for i in members],
+                'memory_count': len(members)
+            })
+        
+        return clusters
+    
+    @staticmethod
+    def _group_memory_embeddings(embeddings: np.ndarray, max_clusters: int) -> List[Tuple[np.ndarray, float]]:
+        """
+        Run k-means over the embeddings.
+        
+        Returns:
+            (member indices ordered most central first, cohesion) per cluster, largest first
+        """
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        vectors = embeddings / np.where(norms > 0, norms, 1.0)
+        
+        n_clusters = max(1, min(max_clusters, len(embeddings) // 3))
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=0, n_init=3, batch_size=256)
+        labels = kmeans.fit_predict(vectors)
+        
+        groups = []
+        for label in range(n_clusters):
+            members = np.flatnonzero(labels == label)
+            if members.size == 0:
+                continue
+            
+            centroid = vectors[members].mean(axis=0)
+            centroid /= np.linalg.norm(centroid) or 1.0
+            similarities = vectors[members] @ centroid
+            order = np.argsort(-similarities, kind='stable')
+            groups.append((members[order], float(similarities.mean())))
+        
+        # Largest clusters first
+        groups.sort(key=lambda group: len(group[0]), reverse=True)
+        return groups
+    
+    async def _label_memory_cluster(self, memories: List[Dict[str, Any]], members: np.ndarray, index: int) -> Tuple[str, str]:
+        """Ask Claude for a (theme, description) of one cluster from its representative memories"""
+        default_label = (f"Memory cluster {index+1}", "")
+        if not self.client:
+            return default_label
+        
+        try:
+            examples = "\n".join(f"- {memories[j]['text'][:200]}" for j in members[:CLUSTER_REPRESENTATIVES])
+            
+            label = await self._cached_completion(
+                _parse_cluster_label,
+                model="claude-3-5-sonnet-20241022",
+                max_tokens=60,
+                messages=[{
+                    "role": "user",
+                    "content": f"""These related memories are the most representative of a group:
+
+{examples}
+
+Respond only with JSON giving the group a short theme and a one-sentence description:
+{{"theme": "cluster theme", "description": "what this cluster represents"}}
+
+JSON:"""
+                }]
+            )
+            
+            return (label.get('theme') or default_label[0], label.get('description', ''))
+            
+        except Exception as e:
+            logger.warning(f"Failed to label memory cluster: {e}")
+            return default_label
+    
+    async def _generate_memory_clusters(self, memories: List[Dict[str, Any]], max_clusters: int) -> List[Dict[str, Any]]:
         """Use Claude to identify thematic clusters in memories"""
         try:
             # Prepare memory summaries for clustering
@@ -233,7 +451,8 @@ JSON:"""
                 text = memory['text'][:200]  # Truncate for API limits
                 memory_summaries.append(f"Memory {i+1}: {text}")
             
-            response = self.client.messages.create(
+            clusters_data = await self._cached_completion(
+                _parse_cluster_list,
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=800,
                 messages=[{
@@ -261,39 +480,34 @@ JSON:"""
                 }]
             )
             
-            # Parse response
-            clusters_text = response.content[0].text.strip()
-            try:
-                clusters_data = json.loads(clusters_text)
-                
-                # Convert to full cluster objects
-                full_clusters = []
-                for cluster in clusters_data:
-                    cluster_memories = []
-                    for idx in cluster.get('memory_indices', []):
-                        if 0 <= idx-1 < len(memories):  # Convert to 0-based indexing
-                            cluster_memories.append(memories[idx-1])
-                    
-                    if cluster_memories:  # Only add clusters with valid memories
-                        full_clusters.append({
-                            'theme': cluster.get('theme', 'Unknown Theme'),
-                            'description': cluster.get('description', ''),
-                            'strength': cluster.get('strength', 'medium'),
-                            'memories': cluster_memories,
-                            'memory_count': len(cluster_memories)
-                        })
-                
-                return full_clusters
-                
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse cluster JSON response")
-                return []
+            # Convert to full cluster objects
+            full_clusters = []
+            for cluster in clusters_data:
+                cluster_memories = []
+                for idx in cluster.get('memory_indices', []):
+                    if 0 <= idx-1 < len(memories):  # Convert to 0-based indexing
+                        cluster_memories.append(memories[idx-1])
                 
+                if cluster_memories:  # Only add clusters with valid memories
+                    full_clusters.append({
+                        'theme': cluster.get('theme', 'Unknown Theme'),
+                        'description': cluster.get('description', ''),
+                        'strength': cluster.get('strength', 'medium'),
+                        'memories': cluster_memories,
+                        'memory_count': len(cluster_memories)
+                    })
+            
+            return full_clusters
+            
+        except _UnparsedResponse:
+            logger.warning("Failed to parse cluster JSON response")
+            return []
+            
         except Exception as e:
             logger.error(f"Failed to generate memory clusters: {e}")
             return []
     
-    def optimize_memory_storage(self) -> Dict[str, Any]:
+    async def optimize_memory_storage(self) -> Dict[str, Any]:
         """
         Optimize memory storage by consolidating similar memories
         and removing redundant information.
@@ -306,18 +520,21 @@ JSON:"""
             initial_stats = self.memory_service.get_memory_statistics()
             
             # Identify clusters for optimization
-            clusters = self.identify_memory_clusters()
+            clusters = await self.identify_memory_clusters()
             
-            optimized_clusters = 0
-            memories_consolidated = 0
+            # Consolidate highly related memories
+            candidates = [
+                cluster for cluster in clusters
+                if cluster['memory_count'] >= 3 and cluster['strength'] == 'high'
+            ]
             
-            for cluster in clusters:
-                if cluster['memory_count'] >= 3 and cluster['strength'] == 'high':
-                    # Consolidate highly related memories
-                    consolidated = self._consolidate_memory_cluster(cluster)
-                    if consolidated:
-                        optimized_clusters += 1
-                        memories_consolidated += cluster['memory_count']
+            if settings.memory_consolidation_batch and len(candidates) > 1:
+                consolidated_clusters = await self._consolidate_memory_clusters_batch(candidates)
+            else:
+                consolidated_clusters = [cluster for cluster in candidates if await self._consolidate_memory_cluster(cluster)]
+            
+            optimized_clusters = len(consolidated_clusters)
+            memories_consolidated = sum(cluster['memory_count'] for cluster in consolidated_clusters)
             
             # Get final statistics
             final_stats = self.memory_service.get_memory_statistics()
@@ -335,20 +552,18 @@ JSON:"""
             logger.error(f"Memory optimization failed: {e}")
             return {"optimization_completed": False, "error": str(e)}
     
-    def _consolidate_memory_cluster(self, cluster: Dict[str, Any]) -> bool:
-        """Consolidate a cluster of related memories into a single comprehensive memory"""
-        try:
-            # Extract texts from cluster memories
-            memory_texts = [mem['text'] for mem in cluster['memories']]
-            combined_text = "\n\n".join(memory_texts)
-            
-            # Generate consolidated summary
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=600,
-                messages=[{
-                    "role": "user",
-                    "content": f"""Consolidate these related memories into a single, comprehensive summary that preserves all important information:
+    def _cluster_consolidation_params(self, cluster: Dict[str, Any]) -> Dict[str, Any]:
+        """Claude request parameters for consolidating one memory cluster"""
+        # Extract texts from cluster memories
+        memory_texts = [mem['text'] for mem in cluster['memories']]
+        combined_text = "\n\n".join(memory_texts)
+        
+        return {
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 600,
+            "messages": [{
+                "role": "user",
+                "content": f"""Consolidate these related memories into a single, comprehensive summary that preserves all important information:
 
 Theme: {cluster['theme']}
 Description: {cluster['description']}
@@ -363,44 +578,109 @@ Create a consolidated memory that:
 4. Includes all important details and insights
 
 Consolidated Memory:"""
-                }]
-            )
+            }]
+        }
+    
+    def _store_consolidated_cluster(self, cluster: Dict[str, Any], consolidated_text: str) -> bool:
+        """Store the consolidated text of a cluster as a new memory"""
+        if not consolidated_text:
+            return False
+        
+        # Create new consolidated memory
+        consolidated_metadata = {
+            "type": "consolidated_cluster",
+            "theme": cluster['theme'],
+            "original_memory_count": cluster['memory_count'],
+            "consolidation_strength": cluster['strength'],
+            "consolidated_at": datetime.utcnow().isoformat()
+        }
+        
+        # Add the consolidated memory
+        memory_id = self.memory_service.add_memory(
+            text=consolidated_text,
+            metadata=consolidated_metadata
+        )
+        
+        # TODO: Remove original memories (would need implementation in memory service)
+        # This is commented out to avoid data loss during testing
+        # self._remove_cluster_memories(cluster['memories'])
+        
+        logger.info(f"✅ Consolidated cluster '{cluster['theme']}' into memory {memory_id}")
+        return True
+    
+    async def _consolidate_memory_cluster(self, cluster: Dict[str, Any]) -> bool:
+        """Consolidate a cluster of related memories into a single comprehensive memory"""
+        try:
+            # Generate consolidated summary
+            response = await self.client.messages.create(**self._cluster_consolidation_params(cluster))
+            return await asyncio.to_thread(self._store_consolidated_cluster, cluster, response.content[0].text.strip())
             
-            consolidated_text = response.content[0].text.strip()
-            
-            if consolidated_text:
-                # Create new consolidated memory
-                consolidated_metadata = {
-                    "type": "consolidated_cluster",
-                    "theme": cluster['theme'],
-                    "original_memory_count": cluster['memory_count'],
-                    "consolidation_strength": cluster['strength'],
-                    "consolidated_at": datetime.utcnow().isoformat()
-                }
-                
-                # Add the consolidated memory
-                memory_id = self.memory_service.add_memory(
-                    text=consolidated_text,
-                    metadata=consolidated_metadata
-                )
-                
-                # TODO: Remove original memories (would need implementation in memory service)
-                # This is commented out to avoid data loss during testing
-                # self._remove_cluster_memories(cluster['memories'])
-                
-                logger.info(f"✅ Consolidated cluster '{cluster['theme']}' into memory {memory_id}")
-                return True
-                
         except Exception as e:
             logger.error(f"Failed to consolidate memory cluster: {e}")
         
         return False
+    
+    async def _consolidate_memory_clusters_batch(self, clusters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Consolidate several clusters through one Message Batches job.
+        
+        Batched requests are billed at half price but complete asynchronously,
+        so this is only used from the background optimization job. Polls until
+        the batch ends or BATCH_MAX_WAIT passes, then stores each result.
+        
+        Returns:
+            The clusters that were consolidated
+        """
+        try:
+            batch = await self.client.messages.batches.create(requests=[
+                {"custom_id": f"cluster-{index}", "params": self._cluster_consolidation_params(cluster)}
+                for index, cluster in enumerate(clusters)
+            ])
+            logger.info(f"📦 Submitted {len(clusters)} memory clusters for batch consolidation ({batch.id})")
+            
+            deadline = time.monotonic() + BATCH_MAX_WAIT
+            while batch.processing_status != "ended":
+                if time.monotonic() > deadline:
+                    logger.warning(f"Batch consolidation {batch.id} timed out, cancelling")
+                    await self.client.messages.batches.cancel(batch.id)
+                    return []
+                await asyncio.sleep(BATCH_POLL_INTERVAL)
+                batch = await self.client.messages.batches.retrieve(batch.id)
+            
+            consolidated = []
+            async for entry in await self.client.messages.batches.results(batch.id):
+                if entry.result.type != "succeeded":
+                    logger.warning(f"Batch consolidation of {entry.custom_id} {entry.result.type}")
+                    continue
+                
+                cluster = clusters[int(entry.custom_id.rsplit("-", 1)[1])]
+                try:
+                    if await asyncio.to_thread(self._store_consolidated_cluster, cluster, entry.result.message.content[0].text.strip()):
+                        consolidated.append(cluster)
+                except Exception as e:
+                    logger.error(f"Failed to store consolidated memory cluster: {e}")
+            
+            return consolidated
+            
+        except Exception as e:
+            logger.error(f"Batch memory consolidation failed: {e}")
+            return []
 
-# Global instance management
-_consolidation_services = {}
+# Global instance management (bounded, idle users expire after an hour)
+_consolidation_services = TTLCache(maxsize=1024, ttl=3600)
+_consolidation_services_lock = threading.Lock()
 
 def get_memory_consolidation_service(user_id: str) -> MemoryConsolidationService:
     """Get or create memory consolidation service for user"""
-    if user_id not in _consolidation_services:
-        _consolidation_services[user_id] = MemoryConsolidationService(user_id)
-    return _consolidation_services[user_id] 
\ No newline at end of file
+    with _consolidation_services_lock:
+        service = _consolidation_services.get(user_id)
+    
+    if service is None:
+        # Constructed outside the lock, memory service setup only delays this user
+        service = MemoryConsolidationService(user_id)
+        with _consolidation_services_lock:
+            return _consolidation_services.setdefault(user_id, service)
+    
+    # Pick up a reconnected or replaced memory service
+    service.memory_service = get_memory_service(user_id)
+    return service 
\ No newline at end of file
@@ -1,13 +1,40 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from app.models.database import UserProfile, Interaction, LearnedPattern
-from app.services.memory import IntelligentMemoryService
+from app.services.memory import get_memory_service
+from collections import Counter
+from operator import itemgetter
+from cachetools import TTLCache
+import numpy as np
+import heapq
 import logging
+import threading
 import json
+import re
 
 logger = logging.getLogger(__name__)
 
+# Keyword extraction, compiled and built once at import. The pattern only
+# matches words longer than 3 characters, so shorter stop words never appear
+_WORD_RE = re.compile(r'\b\w{4,}\b')
+_STOP_WORDS = frozenset({'with', 'what', 'when', 'where', 'this', 'that', 'they', 'were', 'been', 'have', 'does', 'will', 'would', 'could', 'should', 'might'})
+
+# Focus areas in reporting order, with the topic keywords that signal each
+_FOCUS_AREA_KEYWORDS = {
+    "Technology & Programming": ('code', 'programming', 'software', 'ai', 'data', 'algorithm', 'tech'),
+    "Learning & Education": ('learn', 'study', 'understand', 'knowledge', 'education'),
+    "Work & Career": ('work', 'job', 'project', 'business', 'career'),
+    "Creative & Design": ('creative', 'design', 'art', 'music', 'write'),
+}
+_KEYWORD_TO_AREA = {word: area for area, words in _FOCUS_AREA_KEYWORDS.items() for word in words}
+
+def _keywords(text: str):
+    """Meaningful words in a text (longer than 3 characters, not common words)"""
+    return (word for word in _WORD_RE.findall(text.lower()) if word not in _STOP_WORDS)
+
 class ProactiveIntelligenceService:
     """
     Proactive intelligence service that provides insights and suggestions
@@ -20,18 +47,16 @@ class ProactiveIntelligenceService:
     def __init__(self, user_id: str, db: Session):
         self.user_id = user_id
         self.db = db
-        self.memory_service = IntelligentMemoryService(user_id)
+        self.memory_service = get_memory_service(user_id)
     
     def generate_daily_insights(self) -> Dict[str, Any]:
         """Generate daily insights based on user activity and patterns"""
         try:
-            # Get recent interactions
-            recent_interactions = self._get_recent_interactions(days=7)
-            
             # Analyze patterns
-            activity_patterns = self._analyze_activity_patterns(recent_interactions)
-            topic_trends = self._analyze_topic_trends(recent_interactions)
-            communication_insights = self._analyze_communication_style(recent_interactions)
+            patterns = self.analyze_patterns(days=7)
+            activity_patterns = patterns["activity_patterns"]
+            topic_trends = patterns["topic_trends"]
+            communication_insights = patterns["communication_insights"]
             
             # Generate suggestions
             suggestions = self._generate_personalized_suggestions(
@@ -44,78 +69,141 @@ class ProactiveIntelligenceService:
                 "topic_trends": topic_trends,
                 "communication_insights": communication_insights,
                 "suggestions": suggestions,
-                "engagement_score": self._calculate_engagement_score(recent_interactions)
+                "engagement_score": patterns["engagement_score"]
             }
             
         except Exception as e:
             logger.error(f"Failed to generate daily insights: {e}")
             return {"error": "Could not generate insights"}
     
-    def _get_recent_interactions(self, days: int = 7) -> List[Interaction]:
-        """Get recent interactions for analysis"""
+    def analyze_patterns(self, days: int = 7) -> Dict[str, Any]:
+        """
+        Analyze activity, topics, communication style and engagement over the last `days` days.
+        
+        Interactions are read once and every per-interaction statistic is
+        accumulated in that single pass; the analyzers work from the totals.
+        """
+        interactions = self._get_recent_interactions(days=days)
+        count = len(interactions)
+        
+        # Topic keywords for the recent and older halves
+        mid_point = count // 2
+        recent_counts = Counter()
+        older_counts = Counter()
+        
+        # Communication style over non-empty user messages
+        message_count = 0
+        message_length_total = 0
+        question_count = 0
+        
+        # Activity by hour of day and by calendar day
+        hourly_counts = Counter()
+        daily_counts = Counter()
+        
+        # Engagement columns
+        timestamps = np.empty(count, dtype='datetime64[us]')
+        satisfaction_scores = np.empty(count, dtype=np.float64)
+        input_lengths = np.empty(count, dtype=np.float64)
+        
+        for index, interaction in enumerate(interactions):
+            user_input = interaction.user_input or ""
+            
+            counts = recent_counts if index < mid_point else older_counts
+            counts.update(_keywords(user_input))
+            counts.update(_keywords(interaction.assistant_response or ""))
+            
+            if user_input:
+                message_count += 1
+                message_length_total += len(user_input)
+                question_count += '?' in user_input
+            
+            hourly_counts[interaction.timestamp.hour] += 1
+            daily_counts[interaction.timestamp.date()] += 1
+            
+            timestamps[index] = interaction.timestamp
+            satisfaction_scores[index] = interaction.user_satisfaction or 0.5
+            input_lengths[index] = len(user_input)
+        
+        return {
+            "activity_patterns": self._analyze_activity_patterns(days, hourly_counts, daily_counts),
+            "topic_trends": self._analyze_topic_trends(recent_counts, older_counts) if interactions else {"trends": []},
+            "communication_insights": self._analyze_communication_style(message_count, message_length_total, question_count),
+            "engagement_score": self._calculate_engagement_score(timestamps, satisfaction_scores, input_lengths),
+            "total_interactions": count
+        }
+    
+    def _recent_filter(self, days: int):
+        """Filter conditions selecting this user's interactions from the last `days` days"""
         cutoff_date = datetime.utcnow() - timedelta(days=days)
-        return self.db.query(Interaction).filter(
-            Interaction.user_id == self.user_id,
-            Interaction.timestamp >= cutoff_date
+        return (Interaction.user_id == self.user_id, Interaction.timestamp >= cutoff_date)
+    
+    def _get_recent_interactions(self, days: int = 7) -> List[Row]:
+        """
+        Get recent interactions for analysis, newest first.
+        
+        Only the columns the analyzers read are selected, so rows come back as
+        lightweight named tuples instead of tracked Interaction objects.
+        """
+        return self.db.query(
+            Interaction.timestamp,
+            Interaction.user_input,
+            Interaction.assistant_response,
+            Interaction.user_satisfaction
+        ).filter(
+            *self._recent_filter(days)
         ).order_by(Interaction.timestamp.desc()).all()
     
-    def _analyze_activity_patterns(self, interactions: List[Interaction]) -> Dict[str, Any]:
-        """Analyze when and how often the user interacts"""
-        if not interactions:
+    def _analyze_activity_patterns(self, days: int = 7, hourly_counts: Optional[Dict[int, int]] = None, daily_counts: Optional[Dict[Any, int]] = None) -> Dict[str, Any]:
+        """
+        Analyze when and how often the user interacts.
+        
+        analyze_patterns passes the hourly and daily counts it accumulated from
+        the rows it already loaded; without them the counts are grouped in the
+        database, so no interaction rows are loaded.
+        """
+        if hourly_counts is None or daily_counts is None:
+            hourly_counts, daily_counts = self._count_activity(days)
+        
+        if not hourly_counts:
             return {"pattern": "insufficient_data"}
         
-        # Group by hour of day
-        hourly_activity = {}
-        daily_counts = {}
-        
-        for interaction in interactions:
-            hour = interaction.timestamp.hour
-            date = interaction.timestamp.date()
-            
-            hourly_activity[hour] = hourly_activity.get(hour, 0) + 1
-            daily_counts[date] = daily_counts.get(date, 0) + 1
-        
-        # Find peak activity hours
-        peak_hours = sorted(hourly_activity.items(), key=lambda x: x[1], reverse=True)[:3]
+        # Find peak activity hours (ties go to the earlier hour)
+        peak_hours = heapq.nlargest(3, sorted(hourly_counts.items()), key=itemgetter(1))
         
         # Calculate consistency
-        avg_daily_interactions = sum(daily_counts.values()) / len(daily_counts) if daily_counts else 0
+        total_interactions = sum(hourly_counts.values())
+        avg_daily_interactions = total_interactions / len(daily_counts) if daily_counts else 0
         
         return {
-            "total_interactions": len(interactions),
+            "total_interactions": total_interactions,
             "avg_daily_interactions": round(avg_daily_interactions, 1),
             "peak_hours": [f"{hour}:00" for hour, _ in peak_hours],
             "most_active_hour": f"{peak_hours[0][0]}:00" if peak_hours else None,
             "consistency_score": self._calculate_consistency_score(daily_counts)
         }
     
-    def _analyze_topic_trends(self, interactions: List[Interaction]) -> Dict[str, Any]:
-        """Analyze trending topics and interests"""
-        if not interactions:
-            return {"trends": []}
-        
-        # Extract topics from interactions
-        all_text = " ".join([
-            (interaction.user_input or "") + " " + (interaction.assistant_response or "")
-            for interaction in interactions
-        ])
-        
+    def _count_activity(self, days: int) -> Tuple[Dict[int, int], Dict[Any, int]]:
+        """Interaction counts by hour of day and by calendar day, grouped in the database"""
+        hour = func.extract('hour', Interaction.timestamp)
+        hourly_counts = {int(hour_value): count for hour_value, count in self.db.query(hour, func.count(Interaction.id)).filter(
+            *self._recent_filter(days)
+        ).group_by(hour).all()}
+        
+        day = func.date(Interaction.timestamp)
+        daily_counts = dict(self.db.query(day, func.count(Interaction.id)).filter(
+            *self._recent_filter(days)
+        ).group_by(day).all())
+        
+        return hourly_counts, daily_counts
+    
+    def _analyze_topic_trends(self, recent_counts: Counter, older_counts: Counter) -> Dict[str, Any]:
+        """Analyze trending topics and interests from keyword counts of the recent and older halves"""
         # Simple keyword extraction (could be enhanced with NLP)
-        topic_keywords = self._extract_topic_keywords(all_text)
+        topic_keywords = dict((recent_counts + older_counts).most_common(20))
         
         # Analyze recent vs. older interactions for trends
-        mid_point = len(interactions) // 2
-        recent_text = " ".join([
-            (interaction.user_input or "") + " " + (interaction.assistant_response or "")
-            for interaction in interactions[:mid_point]
-        ])
-        older_text = " ".join([
-            (interaction.user_input or "") + " " + (interaction.assistant_response or "")
-            for interaction in interactions[mid_point:]
-        ])
-        
-        recent_topics = self._extract_topic_keywords(recent_text)
-        older_topics = self._extract_topic_keywords(older_text)
+        recent_topics = dict(recent_counts.most_common(20))
+        older_topics = dict(older_counts.most_common(20))
         
         # Find emerging topics
         emerging_topics = [
@@ -130,65 +218,20 @@ class ProactiveIntelligenceService:
             "focus_areas": self._identify_focus_areas(topic_keywords)
         }
     
-    def _extract_topic_keywords(self, text: str) -> Dict[str, int]:
-        """Extract and count topic-relevant keywords"""
-        import re
-        
-        # Simple keyword extraction - could be enhanced
-        words = re.findall(r'\b\w+\b', text.lower())
-        
-        # Filter for meaningful words (exclude common words)
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'how', 'what', 'when', 'where', 'why', 'this', 'that', 'i', 'you', 'we', 'they', 'it', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'can', 'may', 'might'}
-        
-        meaningful_words = [word for word in words if len(word) > 3 and word not in stop_words]
-        
-        # Count occurrences
-        word_counts = {}
-        for word in meaningful_words:
-            word_counts[word] = word_counts.get(word, 0) + 1
-        
-        # Return top words
-        return dict(sorted(word_counts.items(), key=lambda x: x[1], reverse=True)[:20])
-    
     def _identify_focus_areas(self, topic_keywords: Dict[str, int]) -> List[str]:
         """Identify main focus areas from topics"""
-        focus_areas = []
-        
-        # Technology focus
-        tech_words = ['code', 'programming', 'software', 'ai', 'data', 'algorithm', 'tech']
-        if any(word in topic_keywords for word in tech_words):
-            focus_areas.append("Technology & Programming")
-        
-        # Learning focus
-        learning_words = ['learn', 'study', 'understand', 'knowledge', 'education']
-        if any(word in topic_keywords for word in learning_words):
-            focus_areas.append("Learning & Education")
-        
-        # Work focus
-        work_words = ['work', 'job', 'project', 'business', 'career']
-        if any(word in topic_keywords for word in work_words):
-            focus_areas.append("Work & Career")
-        
-        # Creative focus
-        creative_words = ['creative', 'design', 'art', 'music', 'write']
-        if any(word in topic_keywords for word in creative_words):
-            focus_areas.append("Creative & Design")
-        
-        return focus_areas
+        # One pass over the topics, then report areas in their usual order
+        matched_areas = {_KEYWORD_TO_AREA[word] for word in topic_keywords if word in _KEYWORD_TO_AREA}
+        return [area for area in _FOCUS_AREA_KEYWORDS if area in matched_areas]
     
-    def _analyze_communication_style(self, interactions: List[Interaction]) -> Dict[str, Any]:
-        """Analyze user's communication patterns"""
-        if not interactions:
-            return {"style": "unknown"}
-        
-        user_inputs = [interaction.user_input for interaction in interactions if interaction.user_input]
-        
-        if not user_inputs:
+    def _analyze_communication_style(self, message_count: int, message_length_total: int, question_count: int) -> Dict[str, Any]:
+        """Analyze user's communication patterns from totals over their non-empty messages"""
+        if not message_count:
             return {"style": "unknown"}
         
         # Analyze message characteristics
-        avg_length = sum(len(msg) for msg in user_inputs) / len(user_inputs)
-        question_ratio = sum(1 for msg in user_inputs if '?' in msg) / len(user_inputs)
+        avg_length = message_length_total / message_count
+        question_ratio = question_count / message_count
         
         # Determine style
         if avg_length < 50:
@@ -210,7 +253,7 @@ class ProactiveIntelligenceService:
             "avg_message_length": round(avg_length),
             "inquiry_style": inquiry_style,
             "question_ratio": round(question_ratio, 2),
-            "total_messages": len(user_inputs)
+            "total_messages": message_count
         }
     
     def _generate_personalized_suggestions(self, activity: Dict, topics: Dict, communication: Dict) -> List[Dict[str, Any]]:
@@ -260,46 +303,53 @@ class ProactiveIntelligenceService:
         if not daily_counts:
             return 0.0
         
-        values = list(daily_counts.values())
-        avg = sum(values) / len(values)
-        variance = sum((x - avg) ** 2 for x in values) / len(values)
+        values = np.fromiter(daily_counts.values(), dtype=np.float64, count=len(daily_counts))
+        avg = values.mean()
+        variance = values.var()
         
         # Lower variance = higher consistency
-        return max(0, 1 - (variance / avg if avg > 0 else 1))
+        return float(max(0, 1 - (variance / avg if avg > 0 else 1)))
     
-    def _calculate_engagement_score(self, interactions: List[Interaction]) -> float:
-        """Calculate user engagement score"""
-        if not interactions:
+    def _calculate_engagement_score(self, timestamps: np.ndarray, satisfaction_score: np.ndarray, input_lengths: np.ndarray) -> float:
+        """
+        Calculate user engagement score.
+        
+        Factors: recency, frequency, satisfaction, length, given as one
+        column per interaction.
+        """
+        if not timestamps.size:
             return 0.0
         
-        # Factors: recency, frequency, satisfaction, length
-        total_score = 0
-        total_weight = 0
+        # Recency score (more recent = higher score), in whole days
+        days_ago = (np.datetime64(datetime.utcnow(), 'us') - timestamps) // np.timedelta64(1, 'D')
+        recency_score = np.maximum(0, 1 - days_ago / 7)  # Score decreases over 7 days
         
-        for interaction in interactions:
-            # Recency score (more recent = higher score)
-            days_ago = (datetime.utcnow() - interaction.timestamp).days
-            recency_score = max(0, 1 - (days_ago / 7))  # Score decreases over 7 days
-            
-            # Satisfaction score
-            satisfaction_score = interaction.user_satisfaction or 0.5
-            
-            # Length score (longer conversations suggest engagement)
-            length_score = min(1.0, len(interaction.user_input or "") / 100)
-            
-            interaction_score = (recency_score + satisfaction_score + length_score) / 3
-            weight = 1 + recency_score  # Recent interactions weighted more
-            
-            total_score += interaction_score * weight
-            total_weight += weight
+        # Length score (longer conversations suggest engagement)
+        length_score = np.minimum(1.0, input_lengths / 100)
+        
+        interaction_score = (recency_score + satisfaction_score + length_score) / 3
+        weight = 1 + recency_score  # Recent interactions weighted more
         
-        return round(total_score / total_weight if total_weight > 0 else 0, 2)
+        total_weight = weight.sum()
+        return round(float((interaction_score * weight).sum() / total_weight) if total_weight > 0 else 0, 2)
 
-# Global instance management
-_proactive_services = {}
+# Global instance management (bounded, idle users expire after an hour)
+_proactive_services = TTLCache(maxsize=1024, ttl=3600)
+_proactive_services_lock = threading.Lock()
 
 def get_proactive_service(user_id: str, db: Session) -> ProactiveIntelligenceService:
     """Get or create proactive service for user"""
-    if user_id not in _proactive_services:
-        _proactive_services[user_id] = ProactiveIntelligenceService(user_id, db)
-    return _proactive_services[user_id] 
\ No newline at end of file
+    with _proactive_services_lock:
+        service = _proactive_services.get(user_id)
+    
+    if service is None:
+        # Constructed outside the lock, memory service setup only delays this user
+        service = ProactiveIntelligenceService(user_id, db)
+        with _proactive_services_lock:
+            service = _proactive_services.setdefault(user_id, service)
+    
+    # Queries run on the caller's request-scoped session, and memory goes
+    # through the current (possibly reconnected) memory service
+    service.db = db
+    service.memory_service = get_memory_service(user_id)
+    return service 
\ No newline at end of file
@@ -0,0 +1,171 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import threading
+import logging
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+# Appends write three files that must stay row-aligned, and several sidecar
+# instances may share a directory, so locks are per directory (striped)
+_DIRECTORY_LOCKS = tuple(threading.Lock() for _ in range(64))
+
+def _directory_lock(directory: str) -> threading.Lock:
+    """Process-wide lock guarding a sidecar directory"""
+    return _DIRECTORY_LOCKS[hash(os.path.abspath(directory)) % len(_DIRECTORY_LOCKS)]
+
+class QuantizedVectorSidecar:
+    """
+    Int8-quantized copy of a user's memory embeddings, stored next to ChromaDB.
+    
+    ChromaDB only stores float32 vectors, so this sidecar keeps a compact
+    (N, D) int8 matrix plus one float32 factor per row on disk and memory-maps
+    it for search. That is a quarter of the float32 footprint, and a search
+    is a single matrix-vector product over the whole matrix.
+    
+    Files in the sidecar directory:
+    - meta.json: embedding dimension
+    - vectors.i8: row-major int8 matrix
+    - factors.f32: per-row scale divided by the row norm
+    - ids.txt: memory ID for each row, one per line
+    """
+    
+    # Rows scored per block during search, bounds the float32 temporary
+    SEARCH_BLOCK_ROWS = 4096
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._vectors_path = os.path.join(directory, "vectors.i8")
+        self._factors_path = os.path.join(directory, "factors.f32")
+        self._ids_path = os.path.join(directory, "ids.txt")
+        self._lock = _directory_lock(directory)
+        self._dimension: Optional[int] = None
+        self._loaded: Optional[Tuple[np.ndarray, np.ndarray, List[str]]] = None
+        self._loaded_rows = 0
+    
+    @staticmethod
+    def quantize(embedding: Sequence[float]) -> Tuple[np.ndarray, float]:
+        """
+        Symmetrically quantize an embedding to int8.
+        
+        Returns:
+            The int8 vector and the scale that maps it back to float values
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+        if peak == 0.0:
+            return np.zeros(vector.shape, dtype=np.int8), 0.0
+        
+        scale = peak / 127.0
+        quantized = np.clip(np.round(vector / scale), -127, 127).astype(np.int8)
+        return quantized, scale
+    
+    def add(self, memory_id: str, embedding: Sequence[float]):
+        """Append one embedding to the sidecar"""
+        quantized, scale = self.quantize(embedding)
+        
+        # Fold the row norm into the scale so a dot product yields cosine similarity
+        norm = float(np.linalg.norm(quantized.astype(np.float32))) * scale
+        factor = np.float32(scale / norm if norm > 0 else 0.0)
+        
+        with self._lock:
+            dimension = self._get_dimension()
+            if dimension is None:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._meta_path, "w") as f:
+                    json.dump({"dimension": int(quantized.size)}, f)
+                self._dimension = int(quantized.size)
+            elif dimension != quantized.size:
+                raise ValueError(f"Embedding dimension {quantized.size} does not match sidecar dimension {dimension}")
+            
+            with open(self._vectors_path, "ab") as f:
+                f.write(quantized.tobytes())
+            with open(self._factors_path, "ab") as f:
+                f.write(factor.tobytes())
+            with open(self._ids_path, "a") as f:
+                f.write(f"{memory_id}\n")
+            
+            # Appends change the matrix shape, so reopen on next search
+            self._loaded = None
+    
+    def count(self) -> int:
+        """Number of complete rows stored in the sidecar"""
+        with self._lock:
+            return self._count_rows()
+    
+    def search(self, query_embedding: Sequence[float], n_results: int) -> List[Tuple[str, float]]:
+        """
+        Find the stored embeddings most similar to the query.
+        
+        Returns:
+            (memory_id, cosine similarity) pairs, most similar first
+        """
+        loaded = self._load()
+        if loaded is None or n_results <= 0:
+            return []
+        vectors, factors, ids = loaded
+        
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return []
+        query = query / query_norm
+        
+        similarities = np.empty(len(ids), dtype=np.float32)
+        for start in range(0, len(ids), self.SEARCH_BLOCK_ROWS):
+            stop = start + self.SEARCH_BLOCK_ROWS
+            similarities[start:stop] = (vectors[start:stop] @ query) * factors[start:stop]
+        
+        # Partial selection of the top k, then order just those k
+        if n_results < len(ids):
+            top = np.argpartition(-similarities, n_results - 1)[:n_results]
+            top = top[np.argsort(-similarities[top], kind='stable')]
+        else:
+            top = np.argsort(-similarities, kind='stable')
+        return [(ids[i], float(similarities[i])) for i in top]
+    
+    def _get_dimension(self) -> Optional[int]:
+        """Read the embedding dimension, or None if the sidecar is empty"""
+        if self._dimension is None and os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self._dimension = int(json.load(f)["dimension"])
+        return self._dimension
+    
+    def _count_rows(self) -> int:
+        """Count rows from the data file sizes (ignores a trailing partial append)"""
+        dimension = self._get_dimension()
+        if not dimension or not os.path.exists(self._factors_path):
+            return 0
+        
+        vector_rows = os.path.getsize(self._vectors_path) // dimension
+        factor_rows = os.path.getsize(self._factors_path) // 4
+        return min(vector_rows, factor_rows)
+    
+    def _load(self) -> Optional[Tuple[np.ndarray, np.ndarray, List[str]]]:
+        """Memory-map the sidecar files, reusing the mapping until rows are appended"""
+        with self._lock:
+            rows = self._count_rows()
+            if self._loaded is not None and self._loaded_rows != rows:
+                # Another instance sharing the directory appended
+                self._loaded = None
+            
+            if self._loaded is None:
+                if rows == 0:
+                    return None
+                self._loaded_rows = rows
+                
+                dimension = self._get_dimension()
+                vectors = np.memmap(self._vectors_path, dtype=np.int8, mode='r', shape=(rows, dimension))
+                factors = np.fromfile(self._factors_path, dtype=np.float32, count=rows)
+                with open(self._ids_path) as f:
+                    ids = [line.rstrip("\n") for _, line in zip(range(rows), f)]
+                if len(ids) < rows:
+                    rows = len(ids)
+                    vectors, factors = vectors[:rows], factors[:rows]
+                
+                self._loaded = (vectors, factors, ids)
+                logger.debug(f"📐 Loaded {rows} quantized embeddings from {self.directory}")
+            
+            return self._loaded
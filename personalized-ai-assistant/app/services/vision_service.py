@@ -1,13 +1,65 @@
-import base64
 import anthropic
-from typing import Dict, Any, Optional, List
-from datetime import datetime
+import httpx
+from typing import Dict, Any, Optional, List, Tuple, Union
+from collections import OrderedDict
+from io import BytesIO
+from itertools import islice
+import asyncio
+import hashlib
 import logging
+import re
+import time
 from app.config import get_settings
+from app.utils.helpers import utc_timestamp
+
+# SIMD-accelerated base64 straight to str when available
+try:
+    from pybase64 import b64encode_as_string
+except ImportError:
+    from base64 import b64encode
+    
+    def b64encode_as_string(data: Union[bytes, memoryview]) -> str:
+        """Base64-encode to an ASCII string"""
+        return b64encode(data).decode('ascii')
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Completed analyses kept per (image content, prompt), least recently used evicted
+ANALYSIS_CACHE_SIZE = 256
+
+# Claude downsamples anything larger, so oversized images are shrunk to
+# this long edge and re-encoded as JPEG before upload
+MAX_IMAGE_EDGE = 1568
+RESIZED_JPEG_QUALITY = 85
+
+# Images larger than this are base64-encoded on a worker thread
+THREADED_ENCODE_MIN_BYTES = 256 * 1024
+
+# Instructions appended to every analysis prompt
+_PROMPT_SUFFIX = "\n\nPlease provide a detailed analysis including:\n1. What you see in the image\n2. Key insights or observations\n3. Any relevant context or suggestions"
+
+# Keywords marking an analysis line as an insight or a suggestion
+_INSIGHT_KEYWORDS = ('insight', 'notable', 'important', 'key')
+_SUGGESTION_KEYWORDS = ('suggest', 'recommend', 'consider', 'could', 'might')
+
+def _keyword_line_pattern(keywords: Tuple[str, ...]) -> "re.Pattern[str]":
+    """Match whole lines containing any keyword, case-insensitively, anywhere in the line"""
+    alternatives = '|'.join(map(re.escape, keywords))
+    return re.compile(rf'^.*(?:{alternatives}).*$', re.IGNORECASE | re.MULTILINE)
+
+_INSIGHT_LINE_RE = _keyword_line_pattern(_INSIGHT_KEYWORDS)
+_SUGGESTION_LINE_RE = _keyword_line_pattern(_SUGGESTION_KEYWORDS)
+
+# Message Batches polling for offline image analysis, in seconds
+BATCH_POLL_INTERVAL = 15
+BATCH_MAX_WAIT = 3600
+
 class VisionService:
     """
     Vision service for image analysis using Claude 3.5 Sonnet's vision capabilities.
@@ -19,13 +71,25 @@ class VisionService:
     def __init__(self):
         self.client = None
         self.vision_available = False
+        self._cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        # Caps in-flight analyses to stay under the API rate limits
+        self._api_semaphore = asyncio.Semaphore(settings.vision_max_concurrency)
+        # Analyses currently running, keyed like the cache
+        self._inflight: Dict[bytes, "asyncio.Task[Dict[str, Any]]"] = {}
         self._initialize_vision_client()
     
     def _initialize_vision_client(self):
         """Initialize Claude vision client"""
         try:
             if settings.anthropic_api_key:
-                self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+                # One keep-alive connection pool reused by every analysis
+                self.client = anthropic.AsyncAnthropic(
+                    api_key=settings.anthropic_api_key,
+                    http_client=httpx.AsyncClient(
+                        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+                        timeout=60.0
+                    )
+                )
                 self.vision_available = True
                 logger.info("✅ Vision service initialized successfully")
             else:
@@ -33,10 +97,19 @@ class VisionService:
         except Exception as e:
             logger.error(f"❌ Failed to initialize vision service: {e}")
     
-    def analyze_image(self, image_data: bytes, prompt: str = "Analyze this image") -> Dict[str, Any]:
+    async def close(self):
+        """Close the client's connection pool"""
+        if self.client is not None:
+            await self.client.close()
+    
+    async def analyze_image(self, image_data: bytes, prompt: str = "Analyze this image") -> Dict[str, Any]:
         """
         Analyze an image using Claude's vision capabilities.
         
+        Successful analyses are cached by image content and prompt, so the
+        same screenshot sent again is answered without calling Claude.
+        Concurrent requests for the same image and prompt share one call.
+        
         Args:
             image_data: Raw image bytes
             prompt: Analysis prompt
@@ -50,49 +123,30 @@ class VisionService:
                 "description": "Image analysis requires Claude API access"
             }
         
+        cache_key = self._cache_key(image_data, prompt)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            return cached
+        
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._analyze_uncached(cache_key, image_data, prompt))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        
+        # Shielded so one caller giving up doesn't cancel the others' analysis
+        return await asyncio.shield(task)
+    
+    async def _analyze_uncached(self, cache_key: bytes, image_data: bytes, prompt: str) -> Dict[str, Any]:
+        """Call Claude for an image missing from the cache"""
         try:
-            # Convert image to base64
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
-            
-            # Determine image type from file signature
-            image_type = self._detect_image_type(image_data)
-            
             # Analyze image with Claude
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": image_type,
-                                "data": image_base64
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": f"{prompt}\n\nPlease provide a detailed analysis including:\n1. What you see in the image\n2. Key insights or observations\n3. Any relevant context or suggestions"
-                        }
-                    ]
-                }]
-            )
-            
-            analysis = response.content[0].text
-            
-            return {
-                "success": True,
-                "description": analysis,
-                "insights": self._extract_insights(analysis),
-                "suggestions": self._extract_suggestions(analysis),
-                "metadata": {
-                    "image_size": len(image_data),
-                    "analysis_length": len(analysis),
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-            }
+            upload_data = await self._prepare_upload(image_data)
+            params = await self._analysis_params(upload_data, prompt)
+            async with self._api_semaphore:
+                response = await self.client.messages.create(**params)
+            return self._store_result(cache_key, image_data, response.content[0].text)
             
         except Exception as e:
             logger.error(f"❌ Image analysis failed: {e}")
@@ -101,38 +155,206 @@ class VisionService:
                 "description": "Failed to analyze image"
             }
     
-    def _extract_insights(self, analysis: str) -> List[str]:
-        """Extract key insights from analysis text"""
-        # Simple extraction - could be enhanced with NLP
-        insights = []
-        lines = analysis.split('\n')
+    async def analyze_images_batch(self, items: List[Tuple[str, bytes, str]], batch_mode: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze many images for non-interactive work such as bulk ingestion.
+        
+        With batch_mode, uncached images are submitted as one Message Batches
+        job, billed at half price but completed asynchronously; this polls
+        until the batch ends or BATCH_MAX_WAIT passes. Without it, the images
+        are analyzed concurrently through analyze_image.
+        
+        Args:
+            items: (custom_id, image bytes, prompt) for each image
+            batch_mode: Submit through the Message Batches API
+            
+        Returns:
+            Analysis results keyed by custom_id, in the same shape as analyze_image
+        """
+        if not batch_mode or not self.vision_available:
+            results = await asyncio.gather(*(self.analyze_image(image_data, prompt) for _, image_data, prompt in items))
+            return {custom_id: result for (custom_id, _, _), result in zip(items, results)}
+        
+        results = {}
+        pending = {}
+        for custom_id, image_data, prompt in items:
+            cache_key = self._cache_key(image_data, prompt)
+            if cache_key in self._cache:
+                results[custom_id] = self._cache[cache_key]
+            else:
+                pending[custom_id] = (cache_key, image_data, prompt)
+        
+        if not pending:
+            return results
         
-        for line in lines:
-            if any(keyword in line.lower() for keyword in ['insight', 'notable', 'important', 'key']):
-                insights.append(line.strip())
+        error = "No batch result returned"
+        try:
+            upload_data = await asyncio.gather(*(self._prepare_upload(image_data) for _, image_data, _ in pending.values()))
+            params = await asyncio.gather(*(self._analysis_params(data, prompt) for (_, _, prompt), data in zip(pending.values(), upload_data)))
+            batch = await self.client.messages.batches.create(requests=[
+                {"custom_id": custom_id, "params": request_params}
+                for custom_id, request_params in zip(pending, params)
+            ])
+            logger.info(f"📦 Submitted {len(pending)} images for batch analysis ({batch.id})")
+            
+            deadline = time.monotonic() + BATCH_MAX_WAIT
+            while batch.processing_status != "ended":
+                if time.monotonic() > deadline:
+                    await self.client.messages.batches.cancel(batch.id)
+                    raise TimeoutError(f"Batch {batch.id} did not finish within {BATCH_MAX_WAIT} seconds")
+                await asyncio.sleep(BATCH_POLL_INTERVAL)
+                batch = await self.client.messages.batches.retrieve(batch.id)
+            
+            async for entry in await self.client.messages.batches.results(batch.id):
+                cache_key, image_data, _ = pending.pop(entry.custom_id)
+                if entry.result.type == "succeeded":
+                    results[entry.custom_id] = self._store_result(cache_key, image_data, entry.result.message.content[0].text)
+                else:
+                    results[entry.custom_id] = {
+                        "error": f"Batch request {entry.result.type}",
+                        "description": "Failed to analyze image"
+                    }
+            
+        except Exception as e:
+            logger.error(f"❌ Batch image analysis failed: {e}")
+            error = str(e)
         
-        return insights[:5]  # Limit to top 5
+        # Anything the batch didn't answer
+        for custom_id in pending:
+            results[custom_id] = {
+                "error": error,
+                "description": "Failed to analyze image"
+            }
+        
+        return results
     
-    def _extract_suggestions(self, analysis: str) -> List[str]:
-        """Extract suggestions from analysis text"""
-        suggestions = []
-        lines = analysis.split('\n')
+    def _cache_key(self, image_data: bytes, prompt: str) -> bytes:
+        """Analysis cache key for an image and prompt"""
+        return hashlib.blake2b(image_data, digest_size=16).digest() + prompt.encode()
+    
+    async def _prepare_upload(self, image_data: bytes) -> bytes:
+        """Image bytes to send, downscaled on a worker thread only when oversized"""
+        if not self._needs_downscale(image_data):
+            return image_data
+        return await asyncio.to_thread(self._downscale_image, image_data)
+    
+    def _needs_downscale(self, image_data: bytes) -> bool:
+        """Whether the image's long edge exceeds MAX_IMAGE_EDGE, from its header alone"""
+        if Image is None:
+            return False
         
-        for line in lines:
-            if any(keyword in line.lower() for keyword in ['suggest', 'recommend', 'consider', 'could', 'might']):
-                suggestions.append(line.strip())
+        try:
+            with Image.open(BytesIO(image_data)) as image:
+                return max(image.size) > MAX_IMAGE_EDGE
+        except Exception:
+            # Not an image Pillow can read, send it as is
+            return False
+    
+    def _downscale_image(self, image_data: bytes) -> bytes:
+        """
+        Shrink an image whose long edge exceeds MAX_IMAGE_EDGE.
         
-        return suggestions[:3]  # Limit to top 3
+        The image is rotated upright from its EXIF orientation, resized to
+        fit MAX_IMAGE_EDGE, flattened onto white if it has transparency, and
+        re-encoded as JPEG. This cuts the bytes base64-encoded and uploaded
+        for large photos and screenshots. Images Pillow can't process, and
+        re-encodes that come out larger, are returned unchanged.
+        """
+        try:
+            with Image.open(BytesIO(image_data)) as image:
+                # JPEG output drops EXIF, so apply the orientation to the pixels
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.Resampling.BICUBIC)
+                
+                if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+                    # JPEG has no alpha; transparent areas would otherwise turn black
+                    image = image.convert("RGBA")
+                    flattened = Image.new("RGB", image.size, (255, 255, 255))
+                    flattened.paste(image, mask=image.getchannel("A"))
+                    image = flattened
+                
+                output = BytesIO()
+                image.convert("RGB").save(output, format="JPEG", quality=RESIZED_JPEG_QUALITY)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not downscale image, sending original: {e}")
+            return image_data
+        
+        resized = output.getvalue()
+        return resized if len(resized) < len(image_data) else image_data
+    
+    async def _analysis_params(self, image_data: bytes, prompt: str) -> Dict[str, Any]:
+        """Claude request parameters for analyzing one image"""
+        # Convert image to base64 straight from the buffer, off the event loop for large images
+        image_view = memoryview(image_data)
+        if image_view.nbytes > THREADED_ENCODE_MIN_BYTES:
+            image_base64 = await asyncio.to_thread(b64encode_as_string, image_view)
+        else:
+            image_base64 = b64encode_as_string(image_view)
+        
+        # Determine image type from file signature
+        image_type = self._detect_image_type(image_data)
+        
+        return {
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 1000,
+            "messages": [{
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image",
+                        "source": {
+                            "type": "base64",
+                            "media_type": image_type,
+                            "data": image_base64
+                        }
+                    },
+                    {
+                        "type": "text",
+                        "text": prompt + _PROMPT_SUFFIX
+                    }
+                ]
+            }]
+        }
+    
+    def _store_result(self, cache_key: bytes, image_data: bytes, analysis: str) -> Dict[str, Any]:
+        """Build the analysis result and add it to the cache"""
+        result = {
+            "success": True,
+            "description": analysis,
+            "insights": self._extract_insights(analysis),
+            "suggestions": self._extract_suggestions(analysis),
+            "metadata": {
+                "image_size": len(image_data),
+                "analysis_length": len(analysis),
+                "timestamp": utc_timestamp()
+            }
+        }
+        
+        self._cache[cache_key] = result
+        if len(self._cache) > ANALYSIS_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        
+        return result
+    
+    def _extract_insights(self, analysis: str) -> List[str]:
+        """Extract key insights from analysis text"""
+        # Simple extraction - could be enhanced with NLP; stops after the top 5
+        return [match.group().strip() for match in islice(_INSIGHT_LINE_RE.finditer(analysis), 5)]
+    
+    def _extract_suggestions(self, analysis: str) -> List[str]:
+        """Extract suggestions from analysis text"""
+        # Stops after the top 3
+        return [match.group().strip() for match in islice(_SUGGESTION_LINE_RE.finditer(analysis), 3)]
     
     def _detect_image_type(self, image_data: bytes) -> str:
         """Detect image MIME type from file signature"""
-        if image_data.startswith(b'\xff\xd8\xff'):
+        if image_data[:3] == b'\xff\xd8\xff':
             return "image/jpeg"
-        elif image_data.startswith(b'\x89PNG\r\n\x1a\n'):
+        elif image_data[:8] == b'\x89PNG\r\n\x1a\n':
             return "image/png"
-        elif image_data.startswith(b'GIF87a') or image_data.startswith(b'GIF89a'):
+        elif image_data[:6] in (b'GIF87a', b'GIF89a'):
             return "image/gif"
-        elif image_data.startswith(b'RIFF') and b'WEBP' in image_data[:12]:
+        elif image_data[:4] == b'RIFF' and image_data[8:12] == b'WEBP':
             return "image/webp"
         else:
             return "image/jpeg"  # Default fallback
@@ -145,4 +367,9 @@ def get_vision_service() -> VisionService:
     global _vision_service
     if _vision_service is None:
         _vision_service = VisionService()
-    return _vision_service 
\ No newline at end of file
+    return _vision_service
+
+async def close_vision_service():
+    """Release the global vision service's connections, if it was created"""
+    if _vision_service is not None:
+        await _vision_service.close() 
\ No newline at end of file
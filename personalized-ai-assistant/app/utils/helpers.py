@@ -1,9 +1,31 @@
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Union
+import json
+import time
 import os
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Characters not allowed in a user ID
+_USER_ID_RE = re.compile(r'[^a-zA-Z0-9_-]')
+
+# Set once setup_logging has installed its handlers
+_configured = False
 
 def setup_logging():
     """Setup logging configuration"""
+    global _configured
+    
+    # Already configured here or by the host (uvicorn, pytest): don't open another log file
+    if _configured or logging.getLogger().hasHandlers():
+        return logging.getLogger(__name__)
+    
     # Create logs directory if it doesn't exist
     os.makedirs('logs', exist_ok=True)
     
@@ -15,13 +37,22 @@ def setup_logging():
             logging.StreamHandler()
         ]
     )
+    _configured = True
     return logging.getLogger(__name__)
 
 def sanitize_user_id(user_id: str) -> str:
     """Sanitize user ID for safe database operations"""
     # Remove any potentially harmful characters
-    import re
-    return re.sub(r'[^a-zA-Z0-9_-]', '', user_id)
+    return _USER_ID_RE.sub('', user_id)
+
+@lru_cache(maxsize=4)
+def _utc_isoformat(epoch_seconds: int) -> str:
+    """ISO 8601 string for a whole UTC second (naive, like datetime.utcnow())"""
+    return datetime.fromtimestamp(epoch_seconds, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+def utc_timestamp() -> str:
+    """Current UTC time as an ISO 8601 string, formatted at most once per second"""
+    return _utc_isoformat(int(time.time()))
 
 def format_timestamp(timestamp: datetime) -> str:
     """Format timestamp for display"""
@@ -31,4 +62,24 @@ def truncate_text(text: str, max_length: int = 100) -> str:
     """Truncate text to specified length"""
     if len(text) <= max_length:
         return text
-    return text[:max_length-3] + "..." 
\ No newline at end of file
+    return f"{text[:max_length-3]}..."
+
+def json_dumps(obj: Any) -> str:
+    """
+    Serialize to a JSON string, using orjson when it is installed.
+    
+    orjson also serializes numpy scalars and arrays; values it rejects are
+    serialized by json.dumps instead. Under orjson, NaN and infinity become null.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj)
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON document, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
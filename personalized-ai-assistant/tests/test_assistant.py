@@ -1,9 +1,5 @@
 import pytest
-from unittest.mock import Mock, patch
-from app.services.assistant import PersonalizedAssistant
-from app.services.learning import LearningService
-from app.services.embeddings import EmbeddingService
-from app.models.database import UserProfile
+from unittest.mock import Mock, create_autospec, patch
 
 class TestPersonalizedAssistant:
     
@@ -12,10 +8,12 @@ class TestPersonalizedAssistant:
         """Mock database session"""
         return Mock()
     
-    @pytest.fixture
+    @pytest.fixture(scope="session")
     def mock_user_profile(self):
-        """Mock user profile"""
-        profile = Mock(spec=UserProfile)
+        """Mock user profile (read-only, built once per session)"""
+        from app.models.database import UserProfile
+        
+        profile = create_autospec(UserProfile, instance=True)
         profile.user_id = "test_user"
         profile.name = "Test User"
         profile.interests = ["technology"]
@@ -24,6 +22,8 @@ class TestPersonalizedAssistant:
     
     def test_learning_service_extract_topic(self):
         """Test topic extraction from text"""
+        from app.services.learning import LearningService
+        
         learning_service = LearningService("test_user", Mock())
         
         # Test technology topic
@@ -40,6 +40,8 @@ class TestPersonalizedAssistant:
     
     def test_embedding_service(self):
         """Test embedding generation"""
+        from app.services.embeddings import EmbeddingService
+        
         embedding_service = EmbeddingService()
         
         text = "Hello world"
@@ -50,12 +52,139 @@ class TestPersonalizedAssistant:
         assert len(embedding) > 0
         assert all(isinstance(x, float) for x in embedding)
     
+    def test_memory_similarity_filtering(self):
+        """Test distance conversion, threshold filtering and ordering"""
+        from app.services.memory import MemoryService
+        
+        memory_service = MemoryService.__new__(MemoryService)
+        results = {
+            "documents": [["far", "near", "mid"]],
+            "metadatas": [[{"id": 1}, {"id": 2}, {"id": 3}]],
+            "distances": [[0.6, 0.1, 0.2]]
+        }
+        
+        filtered = memory_service._filter_and_convert_results(results, similarity_threshold=0.7)
+        
+        assert filtered["documents"] == [["near", "mid"]]
+        assert filtered["metadatas"] == [[{"id": 2}, {"id": 3}]]
+        assert filtered["similarities"] == pytest.approx([0.9, 0.8])
+    
+    def test_quantized_vector_sidecar_search(self, tmp_path):
+        """Test int8 sidecar storage and top-k search"""
+        from app.services.vector_sidecar import QuantizedVectorSidecar
+        
+        sidecar = QuantizedVectorSidecar(str(tmp_path / "sidecar"))
+        sidecar.add("mem_a", [1.0, 0.0, 0.0])
+        sidecar.add("mem_b", [0.6, 0.8, 0.0])
+        sidecar.add("mem_c", [0.0, 0.0, 2.0])
+        
+        assert sidecar.count() == 3
+        
+        results = sidecar.search([1.0, 0.1, 0.0], n_results=2)
+        assert [memory_id for memory_id, _ in results] == ["mem_a", "mem_b"]
+        assert results[0][1] == pytest.approx(0.995, abs=0.01)
+        
+        # A fresh instance reads the same data back from disk
+        reopened = QuantizedVectorSidecar(str(tmp_path / "sidecar"))
+        assert reopened.search([0.0, 0.0, 1.0], n_results=1)[0][0] == "mem_c"
+    
+    def test_memory_repeat_detection(self):
+        """Test that exact repeats are skipped but edits that change the meaning are stored"""
+        from app.services.memory import MemoryService
+        
+        memory_service = MemoryService.__new__(MemoryService)
+        memory_service.user_id = "test_repeat_user"
+        memory_service.chroma_available = False
+        memory_service.collection = None
+        memory_service.redis_client = Mock()
+        
+        original = memory_service.add_memory("I am allergic to peanuts")
+        
+        assert memory_service.add_memory("i am  ALLERGIC to peanuts") == original
+        assert memory_service.add_memory("I am not allergic to peanuts") != original
+        assert memory_service.redis_client.setex.call_count == 2
+    
+    def test_json_dumps_numpy_scalars(self):
+        """Test that numpy float scores serialize like json.dumps serializes them"""
+        import numpy as np
+        from app.utils.helpers import json_dumps, json_loads
+        
+        payload = {"similarity": np.float64(0.875), "scores": [np.float64(0.5)], 1: "non-string key"}
+        
+        assert json_loads(json_dumps(payload)) == {"similarity": 0.875, "scores": [0.5], "1": "non-string key"}
+    
+    def _short_term_memory_service(self, user_id):
+        """Memory service with short-term memory on an in-process fake Redis and a 1-second-per-write clock"""
+        import itertools
+        fakeredis = pytest.importorskip("fakeredis")
+        from app.services.memory import MemoryService
+        
+        server = fakeredis.FakeServer()
+        memory_service = MemoryService.__new__(MemoryService)
+        memory_service.user_id = user_id
+        memory_service.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+        memory_service.async_redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+        
+        clock = itertools.count(1000.0)
+        return memory_service, patch('app.services.memory.time', Mock(time=lambda: next(clock)))
+    
+    def test_short_term_memory_window(self):
+        """Test trimming to the newest messages, stale payload removal, ordering and the since filter"""
+        from app.services.memory import SHORT_TERM_MAX_MESSAGES
+        
+        memory_service, fake_clock = self._short_term_memory_service("test_short_term_user")
+        index_key, payload_key = memory_service._conversation_keys()
+        total = SHORT_TERM_MAX_MESSAGES + 5
+        
+        with fake_clock:
+            for i in range(total):
+                memory_service.add_to_short_term_memory({"role": "user", "content": str(i)})
+        
+        # Oldest messages are dropped from both the index and the payload hash
+        assert memory_service.redis_client.zcard(index_key) == SHORT_TERM_MAX_MESSAGES
+        assert memory_service.redis_client.hlen(payload_key) == SHORT_TERM_MAX_MESSAGES
+        
+        # The newest messages come back in conversation order
+        recent = memory_service.get_short_term_memory(limit=3)
+        assert [message["content"] for message in recent] == [str(i) for i in range(total - 3, total)]
+        
+        # Message i was stored at 1000 + i
+        since = memory_service.get_short_term_memory(limit=10, since=1000.0 + total - 4)
+        assert [message["content"] for message in since] == [str(i) for i in range(total - 4, total)]
+    
+    def test_short_term_memory_async_window(self):
+        """Test that the async writer and reader keep the same window as the sync ones"""
+        import asyncio
+        from app.services.memory import SHORT_TERM_MAX_MESSAGES
+        
+        memory_service, fake_clock = self._short_term_memory_service("test_async_short_term_user")
+        index_key, payload_key = memory_service._conversation_keys()
+        total = SHORT_TERM_MAX_MESSAGES + 5
+        
+        async def exercise():
+            for i in range(total):
+                await memory_service.aadd_to_short_term_memory({"role": "user", "content": str(i)})
+            return (
+                await memory_service.aget_short_term_memory(limit=3),
+                await memory_service.aget_short_term_memory(limit=10, since=1000.0 + total - 2)
+            )
+        
+        with fake_clock:
+            recent, since = asyncio.run(exercise())
+        
+        assert memory_service.redis_client.zcard(index_key) == SHORT_TERM_MAX_MESSAGES
+        assert memory_service.redis_client.hlen(payload_key) == SHORT_TERM_MAX_MESSAGES
+        assert [message["content"] for message in recent] == [str(i) for i in range(total - 3, total)]
+        assert [message["content"] for message in since] == [str(total - 2), str(total - 1)]
+    
     @patch('app.services.assistant.anthropic.Anthropic')
     @patch('app.services.assistant.MemoryService')
     @patch('app.services.assistant.EmbeddingService')
     @patch('app.services.assistant.LearningService')
     def test_assistant_initialization(self, mock_learning, mock_embedding, mock_memory, mock_anthropic, mock_db):
         """Test assistant initialization"""
+        from app.services.assistant import PersonalizedAssistant
+        
         # Mock the profile query
         mock_db.query.return_value.filter.return_value.first.return_value = None
         